@@ -0,0 +1,62 @@
+import pandas as pd
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+from flood_processors.benchmark import compare_reports, run_benchmarks
+from flood_processors.logs import configure_logging
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every company processor and pipeline stage on synthetic workbooks')
+    parser.add_argument('--rows', '-n', type=int, nargs='+', default=[10000], help='Rows per data sheet (one run per size)')
+    parser.add_argument('--source', '-s', action='append', help='Only benchmark this source folder (can be repeated)')
+    parser.add_argument('--stream', type=int, nargs='?', const=50000, default=None, metavar='ROWS',
+                        help='Run the processors in bounded-memory mode, ROWS rows at a time')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='Worker processes for the pipeline run')
+    parser.add_argument('--workdir', default=None, help='Folder for the generated workbooks and results (default: a temporary folder)')
+    parser.add_argument('--trace-memory', action='store_true', help='Also record peak Python allocations (slower)')
+    parser.add_argument('--cache', action='store_true', help='Keep the Excel cache enabled (default: every read parses the workbook)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic workbooks')
+    parser.add_argument('--output', '-o', help='Save the report as JSON (optional)')
+    parser.add_argument('--baseline', '-b', help='JSON report of an earlier run to compare against (optional)')
+    args = parser.parse_args()
+    configure_logging('benchmark', level=logging.WARNING)
+
+    if not args.cache:
+        # Inherited by the processor processes
+        os.environ['FLOOD_CACHE'] = '0'
+    workdir = args.workdir or tempfile.mkdtemp(prefix='flood-benchmark-')
+
+    try:
+        report = run_benchmarks(args.rows, workdir, sources=args.source, chunk_rows=args.stream,
+                                workers=args.workers, trace_memory=args.trace_memory, seed=args.seed)
+
+        print("=== BENCHMARK ===")
+        print(report.fillna('').to_string(index=False))
+
+        if args.output:
+            report.to_json(args.output, orient='records', indent=2)
+            print(f"\nReport saved to: {args.output}")
+
+        if args.baseline:
+            comparison = compare_reports(report, pd.read_json(args.baseline, orient='records'))
+            print("\n=== COMPARED TO BASELINE ===")
+            print(comparison.fillna('').to_string(index=False))
+
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = report[report['status'] == 'failed']
+    if not failed.empty:
+        print(f"{len(failed)} processors failed", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import argparse
+import logging
+import sys
+
+from flood_processors.geocoder import build_postcode_index, DEFAULT_INDEX_DIR
+from flood_processors.logs import configure_logging
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the offline postcode geocoding index from a CSV of postcode centroids '
+                                                 '(e.g. the ONS Postcode Directory)')
+    parser.add_argument('source', help='CSV file with postcode, latitude and longitude columns')
+    parser.add_argument('--output', '-o', default=None, help=f'Index folder (default: $FLOOD_POSTCODE_INDEX or {DEFAULT_INDEX_DIR})')
+    parser.add_argument('--postcode-column', default=None, help='Name of the postcode column (detected if omitted)')
+    parser.add_argument('--latitude-column', default=None, help='Name of the latitude column (detected if omitted)')
+    parser.add_argument('--longitude-column', default=None, help='Name of the longitude column (detected if omitted)')
+    args = parser.parse_args()
+    configure_logging('build_postcode_index', level=logging.INFO)
+
+    try:
+        meta = build_postcode_index(args.source, args.output, postcode_column=args.postcode_column,
+                                    latitude_column=args.latitude_column, longitude_column=args.longitude_column)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    print("=== POSTCODE INDEX ===")
+    for level, count in meta['counts'].items():
+        print(f"{level:>8}: {count}")
+
+if __name__ == "__main__":
+    main()
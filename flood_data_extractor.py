@@ -17,8 +17,6 @@ logging.basicConfig(
     ]
 )
 
-# UK Postcode regex pattern
-UK_POSTCODE_PATTERN = r'^[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}$'
 
 class FloodDataExtractor:
     def __init__(self, source_dir: str):
@@ -1,97 +1,218 @@
+import os
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import re
-from datetime import datetime
 import logging
 from typing import Dict, List, Optional, Tuple
-import json
+from flood_processors.dates import standardize_dates
+from flood_processors.excel_stream import DEFAULT_CHUNK_ROWS
+from flood_processors.workbook import WorkbookSession
+from flood_processors.records import RecordBuilder
+from flood_processors.dataset import DATASET_DIR, company_path, write_company
+from flood_processors.profiling import ProcessorProfiler
+from flood_processors.logs import ProblemCounter, configure_logging
+from flood_processors.mapping import SourceMapping, compile_sources, unmapped_workbooks
 
 class BaseFloodProcessor:
     def __init__(self, company_name: str):
         self.company_name = company_name
-        self.standardized_data = []
+        self.standardized_data = RecordBuilder(company_name)
+        self.output_path = None
+        self.streaming = False
+        self.chunk_rows = DEFAULT_CHUNK_ROWS
+        self._workbooks: Dict[str, WorkbookSession] = {}
+        self.profiler = ProcessorProfiler(company_name)
+        self.run_report_path = None
         
-        # Set up logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f'{company_name}_processing.log'),
-                logging.StreamHandler()
-            ]
-        )
+        # Log through a queue to logs/<company>.jsonl; per-row problems are counted, not logged one by one
+        configure_logging(company_name, company=company_name)
+        self.problems = ProblemCounter()
     
-    def standardize_date(self, date_value) -> str:
+    def workbook(self, file_path, engine: Optional[str] = None) -> WorkbookSession:
+        """Return the session for a workbook, opening each file at most once per run."""
+        key = str(Path(file_path).resolve())
+        if key not in self._workbooks:
+            self._workbooks[key] = WorkbookSession(file_path, engine=engine)
+        return self._workbooks[key]
+
+    def close_workbooks(self):
+        for session in self._workbooks.values():
+            session.close()
+        self._workbooks = {}
+
+    def read_excel(self, file_path, sheet_name=0, **kwargs) -> pd.DataFrame:
+        """Read a single sheet, reusing the parsed copy from the Excel cache when the file is unchanged."""
+        session = self.workbook(file_path, engine=kwargs.pop('engine', None))
+        with self.profiler.measure('read', file_path, sheet_name) as frame:
+            df = session.read_sheet(sheet_name, **kwargs)
+            frame['rows'] = len(df)
+        return df
+
+    def iter_excel(self, file_path, sheet_name=0, **kwargs):
+        """
+        Yield a sheet as DataFrames. In streaming mode the sheet is read in chunks of
+        `chunk_rows` rows; otherwise the whole (cached) sheet is yielded at once.
+        Reading each chunk is profiled as 'read' and the caller's work on it,
+        until it asks for the next one, as 'transform'.
+        """
+        if not self.streaming:
+            df = self.read_excel(file_path, sheet_name=sheet_name, **kwargs)
+            with self.profiler.measure('transform', file_path, sheet_name, rows=len(df)):
+                yield df
+            return
+
+        session = self.workbook(file_path, engine=kwargs.pop('engine', None))
+        with self.profiler.measure('read', file_path, sheet_name):
+            chunks = session.iter_chunks(sheet_name, self.chunk_rows, usecols=kwargs.get('usecols'))
+        while True:
+            with self.profiler.measure('read', file_path, sheet_name) as frame:
+                df = next(chunks, None)
+                frame['rows'] = 0 if df is None else len(df)
+            if df is None:
+                return
+            with self.profiler.measure('transform', file_path, sheet_name, rows=len(df)):
+                yield df
+
+    def process_sources(self, specs: List[Dict], data_dir=None) -> int:
+        """
+        Read every workbook described by `specs` (see flood_processors.mapping)
+        that exists under `data_dir` (the processor's folder by default) and add
+        its records. Returns the number of workbooks processed.
+        """
+        data_dir = Path(data_dir or self.data_dir)
+        mappings = compile_sources(specs)
+        processed = 0
+        for mapping in mappings:
+            file_path = data_dir / mapping.file
+            if not file_path.exists():
+                logging.debug(f"{mapping.file} not found, skipping")
+                continue
+            logging.info(f"Processing {mapping.file}")
+            self.process_source(mapping, file_path)
+            processed += 1
+        for name in unmapped_workbooks(data_dir, mappings):
+            logging.info(f"Skipping {name}: no source spec")
+        return processed
+
+    def process_source(self, mapping: SourceMapping, file_path) -> None:
+        """Read only the columns a compiled source spec refers to and add them as records, sheet by sheet."""
+        legends = {column: self.legend_codes(file_path, sheet) for column, sheet in mapping.legend_sheets.items()}
+        for sheet in mapping.sheets:
+            for df in self.iter_excel(file_path, sheet_name=sheet, **mapping.read_options):
+                self.add_records(**mapping.apply(df, self.standardize_dates, legends))
+
+    def legend_codes(self, file_path, sheet_name='Legend', column='Unnamed: 0') -> Dict[str, str]:
+        """Code -> description map from a workbook's legend sheet (parsed once per file)."""
+        with self.profiler.measure('read', file_path, sheet_name):
+            return self.workbook(file_path).legend_codes(sheet_name, column)
+
+    def enable_streaming(self, chunk_rows: int = DEFAULT_CHUNK_ROWS, row_group_size: Optional[int] = None):
+        """
+        Switch to bounded-memory mode: sheets are read in chunks and records are
+        flushed to the output parquet as row groups instead of being held in memory.
+        """
+        output_path = self.default_output_path()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._stream_tmp_path = str(output_path.parent / f".{output_path.name}.staging-{os.getpid()}.parquet")
+        self.standardized_data.open_stream(self._stream_tmp_path, row_group_size or chunk_rows)
+        self.streaming = True
+        self.chunk_rows = chunk_rows
+
+    def default_output_path(self) -> Path:
+        return company_path(self.company_name)
+
+    def standardize_dates(self, values: pd.Series, fmt: Optional[str] = None) -> pd.DataFrame:
         """
-        Standardize date to YYYY-MM-DD format.
+        Standardize a whole date column in one vectorized pass.
+        Returns a DataFrame with `incident_date` (datetime64) and `date_precision` columns.
         """
-        if pd.isna(date_value):
+        with self.profiler.measure('parse_dates', rows=len(values)):
+            result = standardize_dates(values, fmt=fmt)
+        failed = pd.Series(values).notna().to_numpy() & result['incident_date'].isna().to_numpy()
+        if failed.any():
+            file, sheet = self.profiler.location()
+            examples = pd.Series(values)[failed].astype(str).unique()[:self.problems.max_examples]
+            self.problems.add('unparseable_date', failed.sum(), examples, file, sheet)
+        return result
+
+    def add_record(self, incident_date: str, incident_type: str, location: Dict) -> None:
+        """Add a single standardized record (row-at-a-time compatibility shim)."""
+        self.standardized_data.add_record(incident_date, incident_type, location)
+
+    def add_records(self, incident_date, incident_type, location: Optional[Dict] = None,
+                    date_precision=None, release: Optional[str] = None, fields: Optional[Dict] = None) -> None:
+        """
+        Add a batch of standardized records given as whole columns.
+        `location` maps location fields (postcode, town, district, county) to columns; scalars are broadcast.
+        `fields` maps incident fields (cause, flooding_location, flooding_type, sub_type) to columns.
+        `release` defaults to the workbook and sheet being read (see current_release).
+        """
+        with self.profiler.measure('build_records') as frame:
+            before = len(self.standardized_data)
+            self.standardized_data.add_columns(incident_date, incident_type, location, date_precision,
+                                               release or self.current_release(), fields)
+            frame['rows'] = len(self.standardized_data) - before
+
+    def current_release(self) -> Optional[str]:
+        """The workbook and sheet being read, e.g. 'EIR 996.xlsx [EIR 966 Final]' (None outside iter_excel)."""
+        file, sheet = self.profiler.location()
+        if file is None:
             return None
+        return f"{file} [{sheet}]" if sheet is not None else file
+
+    def save_results(self, output_path: Optional[str] = None) -> Optional[str]:
+        """
+        Save standardized data to the results dataset as
+        results/incidents/company=<name>/year=<year>/part-<n>.parquet.
+        The partition is written under a temporary name and moved into place, so
+        an interrupted run never leaves a half-written result behind. The run
+        report (see ProcessorProfiler) is written to results/run_reports.
+        """
+        # All input has been read by the time results are saved
+        self.close_workbooks()
+
+        root = DATASET_DIR if output_path is None else f"results/{output_path}"
         try:
-            if isinstance(date_value, str):
-                # Try different date formats
-                for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']:
-                    try:
-                        date_obj = datetime.strptime(date_value, fmt)
-                        return date_obj.strftime('%Y-%m-%d')
-                    except ValueError:
-                        continue
-                
-                # Try year only
-                if re.match(r'^\d{4}$', date_value):
-                    return f"{date_value}-01-01"
-                    
-                # Try year and month
-                if re.match(r'^\d{4}-\d{2}$', date_value):
-                    return f"{date_value}-01"
-                    
-            elif isinstance(date_value, (pd.Timestamp, datetime)):
-                return date_value.strftime('%Y-%m-%d')
-                
-        except Exception as e:
-            logging.warning(f"Date standardization failed for value {date_value}: {str(e)}")
+            with self.profiler.measure('write') as frame:
+                saved = self._write_results(root)
+                frame['rows'] = saved[1] if saved else 0
+        finally:
+            self.problems.log_summary()
+            self.run_report_path = self.profiler.save(len(self.standardized_data), problems=self.problems.summary())
+        if saved is None:
             return None
-            
-        return None
-
-    def create_location_dict(self, **kwargs) -> Dict:
-        """Create a standardized location dictionary."""
-        return {
-            'postcode': kwargs.get('postcode'),
-            'town': kwargs.get('town'),
-            'district': kwargs.get('district'),
-            'county': kwargs.get('county')
-        }
 
-    def add_record(self, incident_date: str, incident_type: str, location: Dict) -> None:
-        """Add a standardized record to the data list."""
-        record = {
-            'company': self.company_name,
-            'incident_date': incident_date,
-            'incident_type': incident_type,
-            'location': location
-        }
-        
-        self.standardized_data.append(record)
+        target, num_rows = saved
+        self.output_path = str(target)
+        logging.info(f"Saved {num_rows} records to {self.output_path}")
+
+        # Results used to be a single file per company
+        legacy_path = Path(f"results/{self.company_name}_incidents.parquet")
+        if legacy_path.exists():
+            legacy_path.unlink()
+            logging.info(f"Removed {legacy_path}, superseded by {self.output_path}")
+        return self.output_path
+
+    def _write_results(self, root: str) -> Optional[Tuple[Path, int]]:
+        """Write the company partition under `root`; returns its path and row count, or None without data."""
+        if self.streaming:
+            # Records have already been written to the staging file as row groups
+            num_rows = self.standardized_data.close_stream()
+            self.streaming = False
+            try:
+                if not num_rows:
+                    logging.warning("No data to save!")
+                    return None
+                return write_company(self._stream_tmp_path, self.company_name, root), num_rows
+            finally:
+                if os.path.exists(self._stream_tmp_path):
+                    os.remove(self._stream_tmp_path)
 
-    def save_results(self, output_path: Optional[str] = None):
-        """Save standardized data to parquet file."""
         if not self.standardized_data:
             logging.warning("No data to save!")
-            return
-            
-        if output_path is None:
-            output_path = f"results/{self.company_name}_incidents.parquet"
-        else:
-            output_path = f"results/{output_path}"
-            
-        # Ensure results directory exists
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-            
-        df = pd.DataFrame(self.standardized_data)
-        df.to_parquet(output_path, index=False)
-        logging.info(f"Saved {len(df)} records to {output_path}")
+            return None
+        table = self.standardized_data.to_table()
+        return write_company(table, self.company_name, root), table.num_rows
 
     def process(self):
         """Main processing method to be implemented by each company."""
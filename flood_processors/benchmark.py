@@ -0,0 +1,125 @@
+import os
+import time
+import logging
+import tracemalloc
+import multiprocessing
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from flood_processors.pipeline import discover_processors, run_pipeline, run_processor
+from flood_processors.profiling import StageProfiler, max_rss_mb, rows_per_second
+from flood_processors.synthetic import generate_source_tree
+
+REPORT_COLUMNS = ['rows_per_sheet', 'kind', 'name', 'status', 'rows', 'seconds', 'rows_per_second',
+                  'peak_rss_mb', 'rss_growth_mb', 'peak_python_mb', 'peak_arrow_mb']
+
+
+@contextmanager
+def working_directory(path):
+    """Run the enclosed block with `path` as the working directory (results/ is relative to it)."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def measure_processor(job: Dict, trace_memory: bool = False) -> Dict:
+    """Run one processor (in a fresh process) and add its throughput and memory high-water marks."""
+    baseline_rss = max_rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    result = run_processor(job)
+    if trace_memory:
+        result['peak_python_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+    result['rows_per_second'] = rows_per_second(result['records'], result['seconds'])
+    result['peak_rss_mb'] = max_rss_mb()
+    if baseline_rss is not None:
+        result['rss_growth_mb'] = round(result['peak_rss_mb'] - baseline_rss, 1)
+    result['peak_arrow_mb'] = round(pa.default_memory_pool().max_memory() / 2 ** 20, 1)
+    return result
+
+
+def benchmark_processors(source_dir: str, sources: Optional[List[str]] = None, chunk_rows: Optional[int] = None,
+                         trace_memory: bool = False) -> List[Dict]:
+    """
+    Run every processor on its own, one after another, each in a newly
+    spawned process so its memory high-water marks are its own and it does
+    not compete with the others for CPU.
+    """
+    jobs = discover_processors(source_dir)
+    if sources:
+        jobs = [job for job in jobs if job['source'] in sources]
+    results = []
+    for job in jobs:
+        job['chunk_rows'] = chunk_rows
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            result = pool.submit(measure_processor, job, trace_memory).result()
+        if result['status'] == 'failed':
+            logging.error(f"{result['source']} failed: {result['error']}")
+        results.append(result)
+    return results
+
+
+def benchmark_pipeline(source_dir: str, workers: Optional[int] = None, sources: Optional[List[str]] = None,
+                       chunk_rows: Optional[int] = None, trace_memory: bool = False) -> List[Dict]:
+    """Run the whole pipeline from scratch and return the wall time, rows and memory of each stage."""
+    profiler = StageProfiler()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        results = run_pipeline(source_dir, workers=workers, sources=sources, incremental=False,
+                               chunk_rows=chunk_rows, profiler=profiler)
+        seconds = round(time.perf_counter() - start, 3)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    records = sum(result['records'] for result in results)
+    total = {'stage': 'total', 'rows': records, 'seconds': seconds,
+             'rows_per_second': rows_per_second(records, seconds), 'max_rss_mb': max_rss_mb()}
+    return [*profiler.stages, total]
+
+
+def run_benchmarks(sizes: List[int], workdir, sources: Optional[List[str]] = None, chunk_rows: Optional[int] = None,
+                   workers: Optional[int] = None, trace_memory: bool = False, seed: int = 0) -> pd.DataFrame:
+    """
+    For each size, generate a synthetic source tree with that many rows per
+    data sheet under `workdir`, benchmark every processor on it and then the
+    pipeline stages. Returns one report row per processor and stage.
+    """
+    rows = []
+    for size in sizes:
+        run_dir = Path(workdir, f'rows-{size}').resolve()
+        source_dir = run_dir / 'source'
+        generate_source_tree(source_dir, rows=size, seed=seed, companies=sources, workers=workers or os.cpu_count() or 1)
+
+        with working_directory(run_dir):
+            for result in benchmark_processors(str(source_dir), sources, chunk_rows, trace_memory):
+                rows.append({'rows_per_sheet': size, 'kind': 'processor', 'name': result['source'],
+                             'rows': result['records'], **result})
+            for stage in benchmark_pipeline(str(source_dir), workers, sources, chunk_rows, trace_memory):
+                rows.append({'rows_per_sheet': size, 'kind': 'stage', 'name': stage['stage'], 'status': 'ok',
+                             **stage, 'peak_rss_mb': stage['max_rss_mb']})
+
+    report = pd.DataFrame(rows)
+    for column in REPORT_COLUMNS:
+        if column not in report:
+            report[column] = None
+    return report[REPORT_COLUMNS]
+
+
+def compare_reports(report: pd.DataFrame, baseline: pd.DataFrame) -> pd.DataFrame:
+    """Throughput and peak memory of each processor and stage relative to an earlier report."""
+    keys = ['rows_per_sheet', 'kind', 'name']
+    merged = report.merge(baseline[[*keys, 'rows_per_second', 'peak_rss_mb']], on=keys, suffixes=('', '_baseline'))
+    merged['speedup'] = (merged['rows_per_second'] / merged['rows_per_second_baseline']).round(2)
+    merged['memory_ratio'] = (merged['peak_rss_mb'] / merged['peak_rss_mb_baseline']).round(2)
+    return merged[[*keys, 'rows_per_second_baseline', 'rows_per_second', 'speedup',
+                   'peak_rss_mb_baseline', 'peak_rss_mb', 'memory_ratio']]
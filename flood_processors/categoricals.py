@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from typing import List
+
+
+def categorical_from_codes(codes, values) -> pd.Categorical:
+    """
+    Categorical whose row i is `values[codes[i]]` (missing where the code is
+    -1). Values may repeat or be missing; repeats become one category.
+
+    This is how a column derived per distinct value (a decoded legend, a
+    normalized postcode) is broadcast back to the rows as codes rather than
+    as one Python object per row.
+    """
+    codes = np.asarray(codes)
+    value_codes, categories = pd.factorize(pd.Series(values, dtype=object))
+    if len(value_codes):
+        row_codes = np.where(codes >= 0, value_codes[np.maximum(codes, 0)], -1)
+    else:
+        row_codes = np.full(len(codes), -1)
+    return pd.Categorical.from_codes(row_codes, categories=pd.Index(categories, dtype=object))
+
+
+def union_categories(frames: List[pd.DataFrame], columns: List[str]) -> List[pd.DataFrame]:
+    """
+    Recode the categorical `columns` of each frame onto the union of their
+    categories, so the frames concatenate as categoricals (and group by
+    integer codes) instead of falling back to object columns. Categories are
+    sorted, so sorting by such a column is alphabetical.
+    """
+    for column in columns:
+        values = [frame[column] for frame in frames]
+        if not values or not all(isinstance(value.dtype, pd.CategoricalDtype) for value in values):
+            continue
+        # A column with no values at all has untyped (object) categories, which would not unite with strings
+        values = [value for value in values if len(value.cat.categories)]
+        if not values:
+            continue
+        categories = union_categoricals(values, sort_categories=True, ignore_order=True).categories
+        frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    return frames
+
+
+def concat_categorical(frames: List[pd.DataFrame], columns: List[str]) -> pd.DataFrame:
+    """pd.concat that keeps the categorical `columns` categorical."""
+    return pd.concat(union_categories(frames, columns), ignore_index=True)
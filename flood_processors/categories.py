@@ -0,0 +1,144 @@
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from flood_processors.hashing import file_sha256
+from flood_processors.stages import ResultStage, set_column
+
+# Hand-maintained (company, incident type) -> category table
+CATEGORIES_PATH = Path(__file__).resolve().parent.parent / 'incidents.csv'
+UNMAPPED_REPORT_PATH = 'results/unmapped_incident_types.csv'
+
+UNMAPPED_COLUMNS = ['company', 'incident_type', 'count']
+
+
+def normalize_keys(values) -> pd.Index:
+    """Case- and whitespace-insensitive form of company names and incident types used for matching."""
+    return pd.Index(values, dtype=object).astype(str).str.strip().str.replace(r'\s+', ' ', regex=True).str.casefold()
+
+
+class CategoryLookup:
+    """
+    Compiled (company, incident_type) -> category lookup built from incidents.csv.
+
+    The CSV is read once into a hashed MultiIndex. Records are categorized by
+    resolving only the distinct (company, incident_type) pairs present in a
+    batch and broadcasting the result back to every row, so the cost grows
+    with the number of incident types rather than the number of incidents.
+    """
+
+    def __init__(self, path=CATEGORIES_PATH):
+        self.path = Path(path)
+        self.hash = file_sha256(self.path)
+        table = pd.read_csv(self.path, usecols=['Company', 'Incident Type', 'Category'], dtype=str)
+        table = table.dropna(subset=['Company', 'Incident Type'])
+
+        keys = pd.MultiIndex.from_arrays([normalize_keys(table['Company']), normalize_keys(table['Incident Type'])])
+        categories = table['Category'].str.strip()
+        # The same type spelt with different case is listed more than once; that is only a problem if the categories disagree
+        conflicting = categories.groupby([keys.get_level_values(0), keys.get_level_values(1)], dropna=False).nunique(dropna=False) > 1
+        if conflicting.any():
+            logging.warning(f"{int(conflicting.sum())} incident types have conflicting categories in {self.path.name}; "
+                            f"using the first listed")
+        duplicated = keys.duplicated()
+        self._keys = keys[~duplicated]
+        categories = categories[~duplicated]
+        # The labelled types as spelt in the CSV, e.g. as examples for IncidentTypeClassifier
+        self.examples = pd.DataFrame({'company': table['Company'][~duplicated].to_numpy(),
+                                      'incident_type': table['Incident Type'][~duplicated].to_numpy(),
+                                      'category': categories.to_numpy()})
+        self.categories = pd.Index(sorted(categories.dropna().unique()), dtype=object)
+        self._codes = self.categories.get_indexer(categories)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def categorize(self, company, incident_type):
+        """
+        Categorize columns of company names and incident types.
+
+        Returns a Categorical of categories (missing where a type is not in
+        incidents.csv) and a DataFrame counting each unmapped pair.
+        """
+        company = pd.Series(company, copy=False).astype('category')
+        incident_type = pd.Series(incident_type, copy=False).astype('category')
+
+        # One integer key per (company, incident_type) pair, with 0 standing for a null
+        type_count = len(incident_type.cat.categories) + 1
+        pair_keys = (company.cat.codes.to_numpy(np.int64) + 1) * type_count + incident_type.cat.codes.to_numpy(np.int64) + 1
+        row_pairs, pairs = pd.factorize(pair_keys)
+        company_codes = pairs // type_count - 1
+        type_codes = pairs % type_count - 1
+
+        positions = np.full(len(pairs), -1, dtype=np.int64)
+        known = (company_codes >= 0) & (type_codes >= 0)
+        if known.any():
+            lookup_keys = pd.MultiIndex.from_arrays([
+                normalize_keys(company.cat.categories[company_codes[known]]),
+                normalize_keys(incident_type.cat.categories[type_codes[known]]),
+            ])
+            positions[known] = self._keys.get_indexer(lookup_keys)
+        pair_categories = np.where(positions >= 0, self._codes[positions], -1)
+        categories = pd.Categorical.from_codes(pair_categories[row_pairs], categories=self.categories)
+
+        # Records without an incident type have nothing to map, so only report real types
+        unmapped = known & (positions < 0)
+        counts = np.bincount(row_pairs, minlength=len(pairs))
+        report = pd.DataFrame({
+            'company': company.cat.categories[company_codes[unmapped]],
+            'incident_type': incident_type.cat.categories[type_codes[unmapped]],
+            'count': counts[unmapped],
+        }, columns=UNMAPPED_COLUMNS)
+        return categories, report
+
+
+class CategoryStage(ResultStage):
+    """
+    Results stage that fills the `category` column from incidents.csv. Any
+    `category_confidence` left by an earlier classification is cleared, so
+    the classifier stage starts again from the labels alone.
+    """
+
+    name = 'categories'
+    columns = ['category', 'category_confidence']
+    report_columns = UNMAPPED_COLUMNS
+
+    def __init__(self, lookup: Optional[CategoryLookup] = None, report_path: str = UNMAPPED_REPORT_PATH):
+        self.lookup = lookup or CategoryLookup()
+        self.report_path = report_path
+
+    @property
+    def hash(self) -> str:
+        return self.lookup.hash
+
+    def apply(self, table: pa.Table) -> Tuple[pa.Table, pd.DataFrame]:
+        columns = table.select(['company', 'incident_type']).to_pandas()
+        categories, unmapped = self.lookup.categorize(columns['company'], columns['incident_type'])
+        table = set_column(table, 'category', categories)
+        return set_column(table, 'category_confidence', pa.nulls(table.num_rows, type=pa.float32())), unmapped
+
+    def report(self, reports: List[pd.DataFrame]) -> None:
+        write_unmapped_report(reports, self.report_path)
+
+
+def write_unmapped_report(unmapped: List[pd.DataFrame], path: str = UNMAPPED_REPORT_PATH) -> Optional[pd.DataFrame]:
+    """
+    Write every unmapped incident type to a single CSV (most frequent first)
+    and log one summary line, instead of warning once per record.
+    """
+    unmapped = [report for report in unmapped if not report.empty]
+    report = pd.concat(unmapped) if unmapped else pd.DataFrame(columns=UNMAPPED_COLUMNS)
+    report = report.sort_values(['count', 'company', 'incident_type'], ascending=[False, True, True])
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    report.to_csv(path, index=False)
+    if report.empty:
+        return None
+
+    per_company = report.groupby('company')['incident_type'].count()
+    summary = ', '.join(f"{company}: {count}" for company, count in per_company.items())
+    logging.warning(f"{len(report)} incident types ({int(report['count'].sum())} records) have no category "
+                    f"in {CATEGORIES_PATH.name} ({summary}); see {path}")
+    return report
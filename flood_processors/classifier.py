@@ -0,0 +1,264 @@
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from flood_processors.categoricals import categorical_from_codes
+from flood_processors.categories import CategoryLookup
+from flood_processors.stages import ResultStage, set_column
+
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+# Bump when normalization, features or scoring change, so results are re-classified
+CLASSIFIER_VERSION = 1
+
+REVIEW_REPORT_PATH = 'results/category_review.csv'
+
+# Categories the classifier assigns; types labelled '?' in incidents.csv are not examples of anything
+CLASSIFIED_CATEGORIES = ['Maintenance', 'Asset Management', 'Not fit for purpose']
+
+# Lengths of the character n-grams incident types are compared by
+NGRAM_SIZES = (2, 3, 4)
+
+# Lowest similarity to the nearest labelled type at which its category is assigned; the rest go to review
+MIN_CONFIDENCE = 0.6
+
+
+def normalize_type_text(values) -> pd.Series:
+    """
+    Case-, punctuation- and whitespace-insensitive form of incident types,
+    e.g. 'INTERNAL - HYDRAULIC OVERLOAD' gives 'internal hydraulic overload'.
+    """
+    text = pd.Series(values, copy=False).astype('string').str.casefold()
+    text = text.str.replace(r'[\W_]+', ' ', regex=True).str.strip()
+    return text.mask(text == '')
+
+
+def char_ngrams(texts: pd.Series) -> pd.DataFrame:
+    """
+    Every character n-gram (of NGRAM_SIZES) of each text, padded with a space
+    at both ends so that word starts and ends count. Returns one row per
+    occurrence, with the position of its `text` and the `gram`; n-grams are
+    sliced out of all texts at once, one offset at a time.
+    """
+    padded = ' ' + texts.reset_index(drop=True).astype('string') + ' '
+    longest = int(padded.str.len().max()) if len(padded) else 0
+    frames = []
+    for size in NGRAM_SIZES:
+        for start in range(max(longest - size + 1, 0)):
+            grams = padded.str.slice(start, start + size)
+            grams = grams[grams.str.len() == size]
+            frames.append(pd.DataFrame({'text': grams.index.to_numpy(), 'gram': grams.to_numpy(dtype=object)}))
+    if not frames:
+        return pd.DataFrame({'text': np.array([], dtype=np.int64), 'gram': np.array([], dtype=object)})
+    return pd.concat(frames, ignore_index=True)
+
+
+class TfidfMatrix:
+    """
+    Sparse TF-IDF matrix of texts over a vocabulary of character n-grams, held
+    as coordinate arrays (`rows`, `terms`, `weights`). Term frequencies are
+    dampened (1 + log tf) and rows are L2-normalized, so the dot product of
+    two rows is their cosine similarity.
+    """
+
+    def __init__(self, rows: np.ndarray, terms: np.ndarray, weights: np.ndarray, shape: Tuple[int, int]):
+        self.rows, self.terms, self.weights, self.shape = rows, terms, weights, shape
+
+    def dot_transposed(self, other: 'TfidfMatrix') -> np.ndarray:
+        """Dense (self.rows x other.rows) matrix of the dot products of every pair of rows."""
+        shape = (self.shape[0], other.shape[0])
+        if sparse is not None:
+            left = sparse.csr_matrix((self.weights, (self.rows, self.terms)), shape=self.shape)
+            right = sparse.csr_matrix((other.weights, (other.rows, other.terms)), shape=other.shape)
+            return (left @ right.T).toarray()
+
+        # Without scipy: join the non-zeros of both matrices on their term and sum the products per pair of rows
+        order = np.argsort(other.terms, kind='stable')
+        terms, rows, weights = other.terms[order], other.rows[order], other.weights[order]
+        starts = np.searchsorted(terms, self.terms, side='left')
+        counts = np.searchsorted(terms, self.terms, side='right') - starts
+        owners = np.repeat(np.arange(len(self.terms)), counts)
+        positions = starts[owners] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pairs = self.rows[owners].astype(np.int64) * shape[1] + rows[positions]
+        products = self.weights[owners] * weights[positions]
+        return np.bincount(pairs, weights=products, minlength=shape[0] * shape[1]).reshape(shape)
+
+
+class TfidfVectorizer:
+    """Character n-gram TF-IDF, with the vocabulary and IDF weights fitted on a reference set of texts."""
+
+    def __init__(self, texts: pd.Series):
+        grams = char_ngrams(texts)
+        distinct = grams.drop_duplicates()
+        self.vocabulary = pd.Index(pd.unique(distinct['gram'].to_numpy(dtype=object)))
+        document_frequency = np.bincount(self.vocabulary.get_indexer(distinct['gram']), minlength=len(self.vocabulary))
+        # Smoothed IDF; n-grams no reference text has get the highest weight
+        self.idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+        self.unseen_idf = np.log(1 + len(texts)) + 1
+
+    def transform(self, texts: pd.Series) -> TfidfMatrix:
+        grams = char_ngrams(texts)
+        counts = grams.groupby(['text', 'gram'], sort=False).size()
+        rows = counts.index.get_level_values('text').to_numpy(np.int64)
+        terms = self.vocabulary.get_indexer(counts.index.get_level_values('gram'))
+        known = terms >= 0
+        weights = (1 + np.log(counts.to_numpy())) * np.where(known, self.idf[np.maximum(terms, 0)], self.unseen_idf)
+        # N-grams outside the vocabulary match nothing, but still count towards the norm
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(texts)))
+        weights = weights / norms[rows]
+        return TfidfMatrix(rows[known], terms[known], weights[known], (len(texts), len(self.vocabulary)))
+
+
+class IncidentTypeClassifier:
+    """
+    Proposes a category for incident types missing from incidents.csv: the
+    category of the most similar labelled type, by cosine similarity of
+    their character n-gram TF-IDF vectors.
+
+    The labelled types (those with one of CLASSIFIED_CATEGORIES) are
+    vectorized once, on first use. Each batch of new types is normalized
+    (see normalize_type_text), vectorized and compared with every labelled
+    type in one sparse matrix product; nearest neighbours are memoized by
+    normalized text, so each spelling is classified once per run.
+    """
+
+    def __init__(self, lookup: Optional[CategoryLookup] = None, min_confidence: float = MIN_CONFIDENCE):
+        self.lookup = lookup or CategoryLookup()
+        self.min_confidence = min_confidence
+        self._fitted = False
+        self._memo: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def hash(self) -> str:
+        return hashlib.sha256(f"{CLASSIFIER_VERSION}:{NGRAM_SIZES}:{self.min_confidence}:{self.lookup.hash}"
+                              .encode()).hexdigest()
+
+    def _fit(self) -> None:
+        if self._fitted:
+            return
+        examples = self.lookup.examples
+        texts = normalize_type_text(examples['incident_type'])
+        usable = (examples['category'].isin(CLASSIFIED_CATEGORIES) & texts.notna()).to_numpy()
+        self.examples = examples[usable].reset_index(drop=True)
+        texts = texts[usable].reset_index(drop=True)
+        self.vectorizer = TfidfVectorizer(texts)
+        self._matrix = self.vectorizer.transform(texts)
+        self._fitted = True
+        logging.debug(f"Fitted the incident type classifier on {len(texts)} labelled types "
+                      f"({len(self.vectorizer.vocabulary)} n-grams)")
+
+    def _classify_new(self, texts: List[str]) -> None:
+        """Nearest labelled type of texts not seen before, all compared in one matrix product."""
+        if not len(self.examples):
+            self._memo.update({text: (-1, 0.0) for text in texts})
+            return
+        similarities = self.vectorizer.transform(pd.Series(texts, dtype=object)).dot_transposed(self._matrix)
+        nearest = similarities.argmax(axis=1)
+        scores = similarities[np.arange(len(texts)), nearest]
+        # Types sharing no n-gram with any labelled type have no neighbour at all
+        nearest = np.where(scores > 0, nearest, -1)
+        self._memo.update(zip(texts, zip(nearest.tolist(), scores.tolist())))
+
+    def classify(self, incident_types) -> pd.DataFrame:
+        """
+        Classify a column of incident types. Returns the `category` of each
+        row's nearest labelled type, the cosine similarity to it as
+        `confidence` (float32) and the nearest type itself (`nearest_company`,
+        `nearest_type`); all missing where a row has no type or no neighbour.
+        Categories are returned whatever their confidence; callers compare it
+        with `min_confidence`.
+        """
+        self._fit()
+        incident_types = pd.Series(incident_types, copy=False)
+        codes, uniques = pd.factorize(incident_types)
+        texts = normalize_type_text(pd.Series(uniques, dtype=object))
+        new = [text for text in dict.fromkeys(texts.dropna()) if text not in self._memo]
+        if new:
+            self._classify_new(new)
+
+        found = [self._memo[text] if isinstance(text, str) else (-1, np.nan) for text in texts]
+        nearest = np.array([example for example, _ in found] + [-1], dtype=np.int64)[codes]
+        confidence = np.array([score if example >= 0 else np.nan for example, score in found] + [np.nan],
+                              dtype=np.float32)[codes]
+        return pd.DataFrame({
+            'category': categorical_from_codes(nearest, self.examples['category']),
+            'confidence': confidence,
+            'nearest_company': categorical_from_codes(nearest, self.examples['company']),
+            'nearest_type': categorical_from_codes(nearest, self.examples['incident_type']),
+        }, index=incident_types.index)
+
+
+def _codes_in(values: pd.Categorical, categories: pd.Index) -> np.ndarray:
+    """Codes of a categorical's values within another set of categories (-1 where missing)."""
+    return np.append(categories.get_indexer(values.categories), -1)[values.codes]
+
+
+class ClassifierStage(ResultStage):
+    """
+    Results stage that categorizes records whose incident type is missing
+    from incidents.csv with IncidentTypeClassifier, after the categories
+    stage. A category is only assigned at `min_confidence` or above; the
+    `category_confidence` of every classified record is kept, so categories
+    from incidents.csv (with no confidence) can be told apart from guessed
+    ones. Classified types are listed in a review queue, least certain first.
+    """
+
+    name = 'classifier'
+    columns = ['category', 'category_confidence']
+    report_columns = ['company', 'incident_type', 'count']
+
+    def __init__(self, classifier: Optional[IncidentTypeClassifier] = None, report_path: str = REVIEW_REPORT_PATH):
+        self.classifier = classifier or IncidentTypeClassifier()
+        self.report_path = report_path
+
+    @property
+    def hash(self) -> str:
+        return self.classifier.hash
+
+    def apply(self, table: pa.Table) -> Tuple[pa.Table, pd.DataFrame]:
+        columns = table.select(['company', 'incident_type', 'category', 'category_confidence']).to_pandas()
+        # Records without a category from incidents.csv, including those this stage categorized before
+        unlabelled = ((columns['category'].isna() | columns['category_confidence'].notna())
+                      & columns['incident_type'].notna()).to_numpy()
+        classified = self.classifier.classify(columns['incident_type'])
+        assigned = unlabelled & (classified['confidence'].to_numpy() >= self.classifier.min_confidence)
+
+        existing = columns['category'].astype('category').array
+        categories = existing.categories.union(pd.Index(CLASSIFIED_CATEGORIES, dtype=object))
+        codes = np.where(unlabelled, -1, _codes_in(existing, categories))
+        codes = np.where(assigned, _codes_in(classified['category'].array, categories), codes)
+        table = set_column(table, 'category', pa.array(pd.Categorical.from_codes(codes, categories=categories)))
+        confidence = np.where(unlabelled, classified['confidence'].to_numpy(), np.nan).astype(np.float32)
+        table = set_column(table, 'category_confidence', pa.array(confidence, from_pandas=True))
+
+        report = pd.DataFrame({'company': columns['company'].to_numpy()[unlabelled],
+                               'incident_type': columns['incident_type'].to_numpy()[unlabelled]})
+        report = report.groupby(['company', 'incident_type'], observed=True, as_index=False).size()
+        return table, report.rename(columns={'size': 'count'})
+
+    def report(self, reports: List[pd.DataFrame]) -> None:
+        reports = [report for report in reports if not report.empty]
+        queue = pd.concat(reports) if reports else pd.DataFrame(columns=self.report_columns)
+        queue = queue.groupby(['company', 'incident_type'], as_index=False)['count'].sum()
+        classified = self.classifier.classify(queue['incident_type'])
+        assigned = classified['confidence'].to_numpy() >= self.classifier.min_confidence
+        queue = pd.concat([queue, classified], axis=1)
+        queue['confidence'] = queue['confidence'].round(3)
+        queue['status'] = np.where(assigned, 'assigned', 'review')
+        queue = queue.sort_values(['status', 'confidence', 'count'], ascending=[False, True, False], na_position='first')
+        Path(self.report_path).parent.mkdir(parents=True, exist_ok=True)
+        queue.to_csv(self.report_path, index=False)
+        if queue.empty:
+            return
+
+        review = queue[queue['status'] == 'review']
+        logging.info(f"Classified {len(queue)} incident types missing from incidents.csv: {int(assigned.sum())} "
+                     f"assigned a category, {len(review)} ({int(review['count'].sum())} records) left for review; "
+                     f"see {self.report_path}")
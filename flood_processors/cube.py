@@ -0,0 +1,132 @@
+import os
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from flood_processors.categoricals import concat_categorical
+from flood_processors.dataset import company_from_path, partition_files, with_company
+
+CUBE_DIR = 'results/cube'
+
+# Dimensions the cube is aggregated over; any group-by over a subset of them is answered from the cube
+CUBE_DIMENSIONS = ['company', 'incident_type', 'category', 'year', 'postcode_district']
+
+_SOURCE_COLUMNS = ['incident_type', 'category', 'incident_date', 'postcode_district']
+
+
+def slice_path(company: str, cube_dir: str = CUBE_DIR) -> Path:
+    return Path(cube_dir) / f'company={company}.parquet'
+
+
+def compute_slice(output) -> pd.DataFrame:
+    """Aggregate one company partition into cube rows (the dimensions plus a record count)."""
+    company = company_from_path(output)
+    partials = []
+    for file in partition_files(output):
+        df = with_company(pq.read_table(file, columns=_SOURCE_COLUMNS), company).to_pandas()
+        df['year'] = pd.to_datetime(df['incident_date']).dt.year.astype('Int16')
+        counts = df.groupby(CUBE_DIMENSIONS, observed=True, dropna=False).size()
+        partials.append(counts.reset_index(name='count'))
+
+    if not partials:
+        return pd.DataFrame(columns=[*CUBE_DIMENSIONS, 'count'])
+    # A year lives in one file, but a year split over several files repeats its groups
+    merged = concat_categorical(partials, CUBE_DIMENSIONS)
+    return merged.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, as_index=False)['count'].sum()
+
+
+def write_slice(slice_df: pd.DataFrame, company: str, cube_dir: str = CUBE_DIR) -> Path:
+    path = slice_path(company, cube_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    pq.write_table(pa.Table.from_pandas(slice_df, preserve_index=False), tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    return path
+
+
+def update_cube(outputs: List[str], state: Dict, fingerprints: Dict[str, Dict], cube_dir: str = CUBE_DIR) -> int:
+    """
+    Recompute the cube slices of companies whose results changed and drop
+    slices of companies no longer present. `state` maps each output to the
+    fingerprint its slice was built from. Returns the number of slices rebuilt.
+    """
+    rebuilt = 0
+    for output in outputs:
+        company = company_from_path(output)
+        if state.get(output) == fingerprints[output] and slice_path(company, cube_dir).exists():
+            continue
+        write_slice(compute_slice(output), company, cube_dir)
+        state[output] = fingerprints[output]
+        rebuilt += 1
+
+    companies = {company_from_path(output) for output in outputs}
+    for path in Path(cube_dir).glob('company=*.parquet'):
+        if company_from_path(path.stem) not in companies:
+            path.unlink()
+    for output in [output for output in state if output not in outputs]:
+        del state[output]
+    if rebuilt:
+        logging.info(f"Rebuilt {rebuilt} of {len(outputs)} cube slices in {cube_dir}")
+    return rebuilt
+
+
+class IncidentCube:
+    """
+    Materialized incident counts by company, incident type, category, year
+    and postcode district.
+
+    The cube is kept as one small Parquet slice per company, recomputed by the
+    pipeline only when that company's results change. Once loaded, any
+    group-by over the dimensions is a pandas aggregation over the (few)
+    cube rows rather than a scan of the incident records.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+
+    @classmethod
+    def load(cls, cube_dir: str = CUBE_DIR) -> 'IncidentCube':
+        slices = [pd.read_parquet(path) for path in sorted(Path(cube_dir).glob('company=*.parquet'))]
+        slices = [slice_df for slice_df in slices if not slice_df.empty]
+        if slices:
+            data = concat_categorical(slices, CUBE_DIMENSIONS)
+        else:
+            data = pd.DataFrame(columns=[*CUBE_DIMENSIONS, 'count'])
+        for dimension in CUBE_DIMENSIONS:
+            if dimension != 'year':
+                data[dimension] = data[dimension].astype('category')
+        data['year'] = data['year'].astype('Int16')
+        data['count'] = data['count'].astype('int64')
+        return cls(data)
+
+    def query(self, group_by: Optional[List[str]] = None, **filters) -> pd.DataFrame:
+        """
+        Count incidents grouped by any of CUBE_DIMENSIONS, e.g.
+        `cube.query(['year', 'category'], company='Severn Trent')`.
+
+        Filters take a single value or a list of values per dimension; `year`
+        also accepts a (first, last) tuple. Without `group_by` the total count
+        is returned as a one-row frame.
+        """
+        group_by = list(group_by or [])
+        unknown = [name for name in [*group_by, *filters] if name not in CUBE_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions {unknown}; expected some of {CUBE_DIMENSIONS}")
+
+        data = self.data
+        mask = pd.Series(True, index=data.index)
+        for name, value in filters.items():
+            if name == 'year' and isinstance(value, tuple):
+                mask &= data['year'].between(*value).fillna(False)
+            elif isinstance(value, (list, set)):
+                mask &= data[name].isin(value)
+            else:
+                mask &= data[name] == value
+        data = data[mask]
+
+        if not group_by:
+            return pd.DataFrame({'count': [int(data['count'].sum())]})
+        return data.groupby(group_by, observed=True, dropna=False, as_index=False)['count'].sum()
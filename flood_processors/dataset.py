@@ -0,0 +1,167 @@
+import os
+import shutil
+import logging
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from flood_processors.schema import INCIDENT_SCHEMA, ROW_GROUP_SIZE, PARQUET_WRITE_OPTIONS, conform
+
+# Standardized records of every company, partitioned as company=<name>/year=<year>/part-<n>.parquet
+DATASET_DIR = 'results/incidents'
+
+# A company-year normally fits in one file; bigger partitions are split so no file gets unwieldy
+MAX_ROWS_PER_FILE = 1_000_000
+# Partitions whose files could be merged into fewer files are rewritten by compact_dataset
+COMPACT_MIN_FILES = 2
+
+# The company is encoded in the directory name, so partition files store everything else
+PARTITION_FILE_SCHEMA = INCIDENT_SCHEMA.remove(INCIDENT_SCHEMA.get_field_index('company'))
+DATASET_SCHEMA = INCIDENT_SCHEMA.append(pa.field('year', pa.int16()))
+
+YEAR_PARTITIONING = ds.partitioning(pa.schema([('year', pa.int16())]), flavor='hive')
+
+
+def company_path(company: str, root: str = DATASET_DIR) -> Path:
+    return Path(root) / f'company={company}'
+
+
+def company_from_path(path) -> str:
+    """Company name encoded in a company=<name> directory (or a file below it)."""
+    for part in reversed(Path(path).parts):
+        if part.startswith('company='):
+            return part[len('company='):]
+    raise ValueError(f"{path} is not inside a company=<name> partition")
+
+
+def partition_files(path) -> List[Path]:
+    """Parquet files of one company partition (or of the whole dataset), skipping temporary files."""
+    return sorted(
+        file for file in Path(path).rglob('*.parquet')
+        if not any(part.startswith(('.', '_')) for part in file.relative_to(path).parts)
+    )
+
+
+def partition_fingerprint(path) -> Dict[str, List[int]]:
+    """Size and modification time of every file of a partition, to tell whether it changed."""
+    return {str(file): [file.stat().st_size, file.stat().st_mtime_ns] for file in partition_files(path)}
+
+
+def with_company(table: pa.Table, company: str) -> pa.Table:
+    """Add the partition's company back to a table read from a partition file."""
+    company_column = pa.DictionaryArray.from_arrays(pa.array(np.zeros(table.num_rows, dtype=np.int32)),
+                                                    pa.array([company]))
+    if 'company' in table.column_names:
+        table = table.drop_columns(['company'])
+    return table.append_column('company', company_column)
+
+
+def open_partition_writer(path) -> pq.ParquetWriter:
+    """ParquetWriter for one partition file."""
+    return pq.ParquetWriter(str(path), PARTITION_FILE_SCHEMA, **PARQUET_WRITE_OPTIONS)
+
+
+def to_partition_file(table: pa.Table) -> pa.Table:
+    """Conform a table to INCIDENT_SCHEMA and drop the columns encoded in the partition path."""
+    return conform(table).drop_columns(['company'])
+
+
+def _write_years(data: ds.Dataset, target: Path) -> None:
+    """Write records into year=<year> partitions under `target`, replacing it atomically."""
+    columns = {name: ds.field(name) for name in PARTITION_FILE_SCHEMA.names}
+    columns['year'] = pc.year(ds.field('incident_date')).cast(pa.int16())
+    scanner = ds.Scanner.from_dataset(data, columns=columns)
+
+    tmp_dir = target.with_name(f".{target.name}.tmp-{os.getpid()}")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    ds.write_dataset(
+        scanner, tmp_dir, format='parquet', partitioning=YEAR_PARTITIONING,
+        file_options=ds.ParquetFileFormat().make_write_options(**PARQUET_WRITE_OPTIONS),
+        basename_template='part-{i}.parquet', max_rows_per_file=MAX_ROWS_PER_FILE,
+        min_rows_per_group=ROW_GROUP_SIZE, max_rows_per_group=ROW_GROUP_SIZE,
+    )
+    _replace_dir(tmp_dir, target)
+
+
+def _replace_dir(new: Path, target: Path) -> None:
+    # A directory cannot be renamed over a non-empty one, so move the old one aside first
+    old = target.with_name(f".{target.name}.old-{os.getpid()}")
+    if target.exists():
+        os.replace(target, old)
+    os.replace(new, target)
+    if old.exists():
+        shutil.rmtree(old)
+
+
+def write_company(data: Union[pa.Table, str], company: str, root: str = DATASET_DIR) -> Path:
+    """
+    Replace a company's partition with new records, split into one directory
+    per year. `data` is an Arrow table or the path of a Parquet file (e.g. the
+    staging file of a streaming run), which is read a batch at a time.
+    """
+    target = company_path(company, root)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, pa.Table):
+        source = ds.dataset(conform(data))
+    else:
+        source = ds.dataset(str(data), format='parquet', schema=INCIDENT_SCHEMA)
+    _write_years(source, target)
+    return target
+
+
+def open_dataset(root: str = DATASET_DIR) -> Optional[ds.Dataset]:
+    """
+    Open the results as one dataset with `company` (dictionary encoded) and
+    `year` partition columns. Filters on either only touch matching files.
+    """
+    root = Path(root)
+    companies = sorted(company_from_path(path) for path in root.glob('company=*')) if root.exists() else []
+    if not companies:
+        return None
+    partitioning = ds.HivePartitioning(pa.schema([DATASET_SCHEMA.field('company'), DATASET_SCHEMA.field('year')]),
+                                       dictionaries={'company': pa.array(companies)})
+    return ds.dataset(str(root), format='parquet', schema=DATASET_SCHEMA, partitioning=partitioning)
+
+
+def read_company(path, columns: Optional[List[str]] = None) -> pa.Table:
+    """Read (some columns of) one company partition, including its `company` column."""
+    company = company_from_path(path)
+    file_columns = None if columns is None else [column for column in columns if column != 'company']
+    files = [str(file) for file in partition_files(path)]
+    data = ds.dataset(files, format='parquet', schema=PARTITION_FILE_SCHEMA)
+    table = with_company(data.to_table(columns=file_columns), company)
+    return table if columns is None else table.select(columns)
+
+
+def compact_dataset(root: str = DATASET_DIR) -> int:
+    """
+    Merge partitions whose rows are spread over more files than needed (e.g.
+    after appends or a change of MAX_ROWS_PER_FILE). Returns the number of
+    partitions rewritten.
+    """
+    rewritten = 0
+    for partition in sorted(Path(root).glob('company=*/year=*')):
+        files = partition_files(partition)
+        if len(files) < COMPACT_MIN_FILES:
+            continue
+        rows = sum(pq.ParquetFile(file).metadata.num_rows for file in files)
+        if len(files) <= -(-rows // MAX_ROWS_PER_FILE):
+            continue
+        tmp_dir = partition.with_name(f".{partition.name}.tmp-{os.getpid()}")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        ds.write_dataset(
+            ds.dataset([str(file) for file in files], format='parquet', schema=PARTITION_FILE_SCHEMA), tmp_dir,
+            format='parquet', file_options=ds.ParquetFileFormat().make_write_options(**PARQUET_WRITE_OPTIONS),
+            basename_template='part-{i}.parquet', max_rows_per_file=MAX_ROWS_PER_FILE,
+            min_rows_per_group=ROW_GROUP_SIZE, max_rows_per_group=ROW_GROUP_SIZE,
+        )
+        _replace_dir(tmp_dir, partition)
+        logging.info(f"Compacted {len(files)} files of {partition} into {len(partition_files(partition))}")
+        rewritten += 1
+    return rewritten
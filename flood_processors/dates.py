@@ -0,0 +1,178 @@
+import pandas as pd
+from typing import Optional
+
+# Excel's serial date system starts at 1899-12-30
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+
+# Plausible ranges used to tell numeric date encodings apart
+YEAR_RANGE = (1900, 2100)
+YYYYMMDD_RANGE = (19000101, 21001231)
+EXCEL_SERIAL_RANGE = (1, 73051)  # 1900-01-01 .. 2100-01-01
+
+# String layouts recognised in text columns: name -> (regex, strptime format, precision)
+STRING_FORMATS = {
+    'iso': (r'\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?', None, 'full_date'),
+    'dmy': (r'\d{1,2}/\d{1,2}/\d{4}', '%d/%m/%Y', 'full_date'),
+    'mdy': (r'\d{1,2}/\d{1,2}/\d{4}', '%m/%d/%Y', 'full_date'),
+    'ymd_slash': (r'\d{4}/\d{1,2}/\d{1,2}', '%Y/%m/%d', 'full_date'),
+    'yyyymmdd': (r'\d{8}', '%Y%m%d', 'full_date'),
+    'year_month': (r'\d{4}-\d{2}', '%Y-%m', 'year_month'),
+    'year_only': (r'\d{4}', '%Y', 'year_only'),
+}
+
+NUMERIC_FORMATS = ('yyyymmdd', 'year_only', 'excel_serial')
+
+DATE_PRECISIONS = ['full_date', 'year_month', 'year_only']
+
+
+def _parse_strings(text: pd.Series, name: str) -> pd.Series:
+    """Parse a string Series with one of STRING_FORMATS; non-matching values become NaT."""
+    pattern, fmt, _ = STRING_FORMATS[name]
+    matches = text.str.fullmatch(pattern).fillna(False).astype(bool)
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    if matches.any():
+        if name == 'iso':
+            values = pd.to_datetime(text[matches].str.slice(0, 10), format='%Y-%m-%d', errors='coerce')
+        else:
+            values = pd.to_datetime(text[matches], format=fmt, errors='coerce')
+        parsed[matches] = values
+    return parsed
+
+
+def _parse_numbers(numbers: pd.Series, name: str) -> pd.Series:
+    """Parse a float Series holding YYYYMMDD integers, Excel serials or bare years."""
+    parsed = pd.Series(pd.NaT, index=numbers.index, dtype='datetime64[ns]')
+    if name == 'yyyymmdd':
+        low, high = YYYYMMDD_RANGE
+        mask = numbers.between(low, high) & (numbers % 1 == 0)
+        if mask.any():
+            text = numbers[mask].astype('int64').astype(str)
+            parsed[mask] = pd.to_datetime(text, format='%Y%m%d', errors='coerce')
+    elif name == 'excel_serial':
+        low, high = EXCEL_SERIAL_RANGE
+        mask = numbers.between(low, high)
+        if mask.any():
+            parsed[mask] = EXCEL_EPOCH + pd.to_timedelta(numbers[mask].astype('float64'), unit='D')
+    elif name == 'year_only':
+        low, high = YEAR_RANGE
+        mask = numbers.between(low, high) & (numbers % 1 == 0)
+        if mask.any():
+            text = numbers[mask].astype('int64').astype(str)
+            parsed[mask] = pd.to_datetime(text, format='%Y', errors='coerce')
+    return parsed
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """
+    Render values as stripped strings. Datetime objects in object columns come out
+    as ISO text and whole floats lose their trailing '.0', so both parse as strings.
+    """
+    return values.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+
+
+def _format_precision(name: str) -> str:
+    if name in STRING_FORMATS:
+        return STRING_FORMATS[name][2]
+    return 'full_date'
+
+
+def detect_formats(values: pd.Series, sample_size: int = 1000) -> list:
+    """
+    Work out which date layouts a column uses from a sample of its non-null values.
+    Returns format names ordered from most to least common in the sample.
+    """
+    sample = values.dropna().head(sample_size)
+    if sample.empty:
+        return []
+
+    numbers = pd.to_numeric(sample, errors='coerce')
+    counts = {}
+    if numbers.notna().all():
+        # Purely numeric column: YYYYMMDD integers, Excel serials or years
+        for name in NUMERIC_FORMATS:
+            counts[name] = int(_parse_numbers(numbers, name).notna().sum())
+            if counts[name] == len(sample):
+                break
+    else:
+        text = _as_text(sample)
+        for name in STRING_FORMATS:
+            counts[name] = int(_parse_strings(text, name).notna().sum())
+
+    ranked = sorted((name for name, count in counts.items() if count), key=lambda name: -counts[name])
+    if counts.get('year_only', 0) > len(sample) / 2:
+        # Years are valid Excel serials too (2019 is 1905-07-11), so a column of mostly years is read as years only
+        ranked = ['year_only', *[name for name in ranked if name not in ('year_only', 'excel_serial')]]
+    return ranked
+
+
+def standardize_dates(values, fmt: Optional[str] = None, sample_size: int = 1000) -> pd.DataFrame:
+    """
+    Standardize a whole column of dates in a single vectorized pass.
+
+    The layout(s) used by the column are detected from a sample (or forced with
+    `fmt`, one of the STRING_FORMATS / NUMERIC_FORMATS names) and applied to the
+    full column at once. Returns a DataFrame with `incident_date` (datetime64
+    at midnight, NaT when unparseable) and a categorical `date_precision`
+    (one of DATE_PRECISIONS).
+    """
+    values = pd.Series(values, copy=False)
+    index = values.index
+    values = values.reset_index(drop=True)
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    precision = pd.Series(None, index=values.index, dtype=object)
+
+    if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ('datetime', 'datetime64', 'date'):
+        # Object column holding only datetime objects (e.g. Excel cells padded with blanks)
+        values = pd.to_datetime(values, errors='coerce')
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parsed = values.dt.tz_localize(None) if values.dt.tz is not None else values.astype('datetime64[ns]')
+        precision[parsed.notna()] = 'full_date'
+        return _result(parsed, precision, index)
+
+    present = values.notna()
+    if not present.any():
+        return _result(parsed, precision, index)
+
+    if fmt is not None:
+        formats = [fmt]
+    else:
+        formats = detect_formats(values, sample_size)
+        # Values absent from the sample may still use another layout
+        if pd.api.types.is_numeric_dtype(values):
+            # Stray numbers in a column of years are left unparseable rather than read as Excel serials
+            years = formats[:1] == ['year_only']
+            fallback = [name for name in NUMERIC_FORMATS if not (years and name == 'excel_serial')]
+            formats += [name for name in fallback if name not in formats]
+        else:
+            formats += [name for name in STRING_FORMATS if name not in formats]
+
+    numeric_column = pd.api.types.is_numeric_dtype(values)
+    numbers = None
+    text = None
+    for name in formats:
+        remaining = present & parsed.isna()
+        if not remaining.any():
+            break
+        if name in NUMERIC_FORMATS and (name not in STRING_FORMATS or numeric_column):
+            if numbers is None:
+                numbers = pd.to_numeric(values, errors='coerce')
+            step = _parse_numbers(numbers[remaining], name)
+        else:
+            if text is None:
+                text = _as_text(values)
+            step = _parse_strings(text[remaining], name)
+        hits = step.notna()
+        if hits.any():
+            parsed[step.index[hits]] = step[hits]
+            precision[step.index[hits]] = _format_precision(name)
+
+    return _result(parsed, precision, index)
+
+
+def _result(parsed: pd.Series, precision: pd.Series, index: pd.Index) -> pd.DataFrame:
+    precision[parsed.isna()] = None
+    result = pd.DataFrame({'incident_date': parsed.dt.normalize(),
+                           'date_precision': pd.Categorical(precision, categories=DATE_PRECISIONS)})
+    result.index = index
+    return result
@@ -0,0 +1,251 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from flood_processors.categoricals import concat_categorical
+from flood_processors.categories import normalize_keys
+from flood_processors.dataset import company_from_path, open_partition_writer, partition_files, to_partition_file, with_company
+from flood_processors.postcodes import normalize_postcodes
+from flood_processors.schema import LOCATION_FIELDS, ROW_GROUP_SIZE
+
+DUPLICATES_REPORT_PATH = 'results/duplicates.csv'
+
+REPORT_COLUMNS = ['company', 'release', 'duplicate_of_company', 'duplicate_of_release', 'count']
+
+_FINGERPRINT_COLUMNS = ['incident_date', 'incident_type', 'release', *[f'location_{field}' for field in LOCATION_FIELDS]]
+
+
+def _hash_distinct(values: pd.Series, normalize) -> np.ndarray:
+    """Hash of each row's normalized value, normalizing and hashing every distinct value once (0 for missing)."""
+    codes, uniques = pd.factorize(values)
+    normalized = normalize(pd.Series(uniques, dtype=object))
+    hashes = pd.util.hash_array(np.asarray(normalized.astype(object).fillna(''), dtype=object))
+    hashes = np.where(np.asarray(normalized.isna()), np.uint64(0), hashes)
+    return np.append(hashes, np.uint64(0))[codes]
+
+
+def _normalize_text(values: pd.Series) -> pd.Series:
+    text = pd.Series(normalize_keys(values), index=values.index, dtype=object)
+    return text.mask(values.isna() | (text == ''))
+
+
+def _normalize_postcode(values: pd.Series) -> pd.Series:
+    # 'sw1a1aa' and 'SW1A 1AA' are the same postcode
+    return normalize_postcodes(values).str.replace(' ', '', regex=False)
+
+
+def record_fingerprints(table: pa.Table) -> pd.DataFrame:
+    """
+    Fingerprint standardized records by their normalized date, location and
+    incident type.
+
+    The location is the normalized postcode, or the town, district or county
+    where a record has no postcode. Returns a 64-bit `fingerprint` per row and
+    whether it is `comparable`: records without a date or any location cannot
+    be told apart from other incidents, so they are never treated as
+    duplicates.
+    """
+    dates = table.column('incident_date')
+    days = pc.fill_null(dates.cast(pa.int32()), 0).to_numpy()
+
+    location = np.zeros(table.num_rows, dtype=np.uint64)
+    for field in LOCATION_FIELDS:
+        normalize = _normalize_postcode if field == 'postcode' else _normalize_text
+        hashes = _hash_distinct(table.column(f'location_{field}').to_pandas(), normalize)
+        # Fields are tried in order, so a town only counts where there is no postcode
+        location = np.where(location == 0, hashes, location)
+    incident_type = _hash_distinct(table.column('incident_type').to_pandas(), _normalize_text)
+
+    parts = pd.DataFrame({'date': days, 'location': location, 'type': incident_type})
+    return pd.DataFrame({
+        'fingerprint': pd.util.hash_pandas_object(parts, index=False).to_numpy(),
+        'comparable': dates.is_valid().to_numpy(zero_copy_only=False) & (location != 0),
+    })
+
+
+def find_duplicates(records: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mark records that repeat an incident already listed by another release.
+
+    `records` has one row per record with `fingerprint` and categorical
+    `company` and `release` columns. Releases are ranked by company and
+    release name; each fingerprint keeps as many records as the release
+    listing it most often has, taken from the highest-ranked releases first.
+    A release listing the same fingerprint twice is taken to describe two
+    incidents, so repeats within one release are never removed. Adds a
+    `duplicate` flag and, for duplicates, the company and release of the
+    first release listing the incident (`duplicate_of_company`,
+    `duplicate_of_release`).
+    """
+    releases = records.groupby(['company', 'release'], observed=True, dropna=False, sort=True)
+    names = releases.size().index
+    rank = releases.ngroup().to_numpy()
+
+    per_release = pd.DataFrame({'fingerprint': records['fingerprint'].to_numpy(), 'rank': rank})
+    per_release = per_release.groupby(['fingerprint', 'rank'], sort=True).size().rename('count').reset_index()
+    # Records of each fingerprint already accounted for by higher-ranked releases
+    covered = per_release.groupby('fingerprint')['count'].cummax().groupby(per_release['fingerprint']).shift(fill_value=0)
+    per_release['keep'] = (per_release['count'] - covered).clip(lower=0)
+    per_release['first_rank'] = per_release.groupby('fingerprint')['rank'].transform('first')
+
+    keys = pd.DataFrame({'fingerprint': records['fingerprint'].to_numpy(), 'rank': rank})
+    occurrence = keys.groupby(['fingerprint', 'rank']).cumcount().to_numpy()
+    keys = keys.merge(per_release[['fingerprint', 'rank', 'keep', 'first_rank']], on=['fingerprint', 'rank'],
+                      how='left', sort=False)
+    duplicate = occurrence >= keys['keep'].to_numpy()
+    first_rank = np.where(duplicate, keys['first_rank'].to_numpy(), -1)
+
+    records = records.assign(duplicate=duplicate)
+    for level, name in enumerate(['company', 'release']):
+        values = names.get_level_values(level)
+        categories = records[name].cat.categories
+        codes = np.append(categories.get_indexer(values), -1)[first_rank]
+        records[f'duplicate_of_{name}'] = pd.Categorical.from_codes(codes, categories=categories)
+    return records
+
+
+def scan_fingerprints(outputs: List[str]) -> Tuple[pd.DataFrame, List[Path]]:
+    """
+    Fingerprint every record of the given company partitions. Returns the
+    comparable records, with the index into the returned file list and the
+    row position each came from.
+    """
+    frames, files = [], []
+    for output in outputs:
+        company = company_from_path(output)
+        for file in partition_files(output):
+            table = pq.read_table(file, columns=_FINGERPRINT_COLUMNS)
+            fingerprints = record_fingerprints(table)
+            fingerprints['company'] = pd.Categorical([company] * table.num_rows)
+            fingerprints['release'] = pd.Categorical(table.column('release').to_pandas())
+            fingerprints['file'] = np.int32(len(files))
+            fingerprints['row'] = np.arange(table.num_rows)
+            frames.append(fingerprints[fingerprints['comparable'].to_numpy()].drop(columns=['comparable']))
+            files.append(file)
+    if not frames:
+        return pd.DataFrame(columns=['fingerprint', 'company', 'release', 'file', 'row']), files
+    return concat_categorical(frames, ['company', 'release']), files
+
+
+def drop_rows(file, rows: np.ndarray, batch_rows: int = ROW_GROUP_SIZE) -> None:
+    """Rewrite one partition file without the given row positions, replacing it atomically."""
+    file = Path(file)
+    company = company_from_path(file)
+    tmp_path = file.with_name(f".{file.name}.tmp-{os.getpid()}")
+    writer = None
+    try:
+        parquet_file = pq.ParquetFile(file)
+        keep = np.ones(parquet_file.metadata.num_rows, dtype=bool)
+        keep[rows] = False
+        writer = open_partition_writer(tmp_path)
+        start = 0
+        for batch in parquet_file.iter_batches(batch_size=batch_rows):
+            table = pa.Table.from_batches([batch]).filter(pa.array(keep[start:start + batch.num_rows]))
+            start += batch.num_rows
+            writer.write_table(to_partition_file(with_company(table, company)), row_group_size=batch_rows)
+        writer.close()
+        writer = None
+        os.replace(tmp_path, file)
+    finally:
+        if writer is not None:
+            writer.close()
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def deduplicate_results(outputs: List[str]) -> Dict:
+    """
+    Remove records that more than one release lists, across all company
+    partitions, in one pass over their fingerprints.
+
+    Returns the overlap `report` (records removed per release and the release
+    already listing them), the same split per output as `reports`, the number
+    of records `removed`, and `covered_by`: per output, the other outputs
+    holding the records it lost. Those companies must be reprocessed when a
+    covering output changes, or the records would be lost altogether.
+    """
+    records, files = scan_fingerprints(outputs)
+    if records.empty:
+        return {'report': pd.DataFrame(columns=REPORT_COLUMNS), 'reports': {}, 'covered_by': {}, 'removed': 0}
+    records = find_duplicates(records)
+    duplicates = records[records['duplicate'].to_numpy()]
+
+    for file, rows in duplicates.groupby('file')['row']:
+        drop_rows(files[file], rows.to_numpy())
+
+    report = duplicates.groupby(REPORT_COLUMNS[:-1], observed=True, dropna=False, as_index=False).size()
+    report = report.rename(columns={'size': 'count'}).sort_values('count', ascending=False, ignore_index=True)
+
+    outputs_by_company = {company_from_path(output): output for output in outputs}
+    reports, covered_by = {}, {}
+    for company, rows in report.groupby('company', observed=True):
+        output = outputs_by_company[company]
+        reports[output] = rows.reset_index(drop=True)
+        covering = rows.loc[rows['duplicate_of_company'] != company, 'duplicate_of_company'].unique()
+        if len(covering):
+            covered_by[output] = sorted(outputs_by_company[other] for other in covering)
+    return {'report': report, 'reports': reports, 'covered_by': covered_by, 'removed': len(duplicates)}
+
+
+def write_duplicates_report(report: pd.DataFrame, total_records: int,
+                            path: str = DUPLICATES_REPORT_PATH) -> None:
+    """Write the overlap between releases to a CSV and log one summary line."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    report.to_csv(path, index=False)
+    if report.empty:
+        logging.info("No records are listed by more than one release")
+        return
+    removed = int(report['count'].sum())
+    across = report[report['company'] != report['duplicate_of_company']]
+    logging.info(f"Removed {removed} duplicate records ({removed / max(total_records, 1):.1%}) listed by more than "
+                 f"one release, {int(across['count'].sum())} of them across companies; see {path}")
+
+
+def update_duplicates(outputs: List[str], changed: List[str], state: Dict, total_records: int,
+                      path: str = DUPLICATES_REPORT_PATH) -> int:
+    """
+    Deduplicate the results whenever any company's output was rebuilt
+    (`changed`), keeping the overlap report of every output in `state` so
+    the report covers all results, not only this run's removals. Returns the
+    number of records removed.
+    """
+    outputs_state = state.setdefault('outputs', {})
+    if not changed and all(output in outputs_state for output in outputs) and Path(path).exists():
+        return 0
+    result = deduplicate_results(outputs)
+    for output in outputs:
+        entry = outputs_state.get(output) if output not in changed else None
+        rows = (entry['report'] if entry else []) + result['reports'].get(output, pd.DataFrame()).astype(object).values.tolist()
+        report = pd.DataFrame(rows, columns=REPORT_COLUMNS).astype({'count': 'int64'})
+        report = report.groupby(REPORT_COLUMNS[:-1], dropna=False, as_index=False)['count'].sum()
+        covered_by = set(entry['covered_by'] if entry else []) | set(result['covered_by'].get(output, []))
+        outputs_state[output] = {'report': report.astype(object).values.tolist(), 'covered_by': sorted(covered_by)}
+    for output in [output for output in outputs_state if output not in outputs]:
+        del outputs_state[output]
+
+    report = pd.DataFrame([row for entry in outputs_state.values() for row in entry['report']], columns=REPORT_COLUMNS)
+    write_duplicates_report(report.sort_values('count', ascending=False, ignore_index=True), total_records, path)
+    return result['removed']
+
+
+def covered_outputs(state: Dict, changed: List[str]) -> List[str]:
+    """
+    Outputs that lost records to a duplicate in one of the `changed` outputs,
+    directly or through another covered output. They must be rebuilt along
+    with it, since the records they lost may no longer be there.
+    """
+    covered_by = {output: set(entry.get('covered_by', [])) for output, entry in state.get('outputs', {}).items()}
+    changed, covered = set(changed), set()
+    while True:
+        found = {output for output, covering in covered_by.items()
+                 if covering & (changed | covered) and output not in changed | covered}
+        if not found:
+            return sorted(covered)
+        covered |= found
+
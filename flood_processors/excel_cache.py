@@ -0,0 +1,120 @@
+import os
+import json
+import hashlib
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, Optional
+
+from flood_processors.hashing import file_sha256
+
+# Bump when the on-disk format changes so stale entries are ignored
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / '.cache' / 'excel'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+class ExcelCache:
+    """
+    Content-addressed cache of parsed Excel sheets.
+
+    Entries are keyed on the workbook's content hash, the sheet name and the
+    reader options, and stored as Parquet files so a repeated read skips the
+    zip/XML parsing entirely. The least recently used entries are evicted once
+    the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None, enabled: bool = True):
+        self.cache_dir = Path(cache_dir or os.environ.get('FLOOD_CACHE_DIR', DEFAULT_CACHE_DIR))
+        self.max_bytes = int(max_bytes or os.environ.get('FLOOD_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.enabled = enabled and os.environ.get('FLOOD_CACHE', '1') != '0'
+
+    def key(self, file_path, sheet_name, options: Dict) -> str:
+        """Cache key for one sheet of one workbook read with the given options."""
+        payload = json.dumps({
+            'version': CACHE_VERSION,
+            'pandas': pd.__version__,
+            'file': file_sha256(file_path),
+            'sheet': sheet_name,
+            'options': options,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        path = self._entry_path(key)
+        if not path.exists():
+            return None
+        try:
+            table = pq.read_table(path)
+            df = table.to_pandas()
+        except (OSError, pa.ArrowException) as e:
+            logging.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        # Restore non-string column names (e.g. year headers) that Parquet stores as text
+        metadata = table.schema.metadata or {}
+        if b'flood_columns' in metadata:
+            df.columns = json.loads(metadata[b'flood_columns'])
+
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path)
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """Store a parsed sheet. Returns False if the frame cannot be represented in Arrow."""
+        columns = list(df.columns)
+        if not all(isinstance(c, (str, int, float)) for c in columns):
+            return False
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=None)
+        except (pa.ArrowException, TypeError) as e:
+            # Typically a column mixing numbers and text; such sheets are read from Excel every time
+            logging.info(f"Sheet not cacheable ({e})")
+            return False
+
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'flood_columns'] = json.dumps(columns).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for path in self.cache_dir.glob('*.parquet'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+_default_cache: Optional[ExcelCache] = None
+
+
+def get_excel_cache() -> ExcelCache:
+    """Process-wide cache instance configured from the environment."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ExcelCache()
+    return _default_cache
@@ -0,0 +1,110 @@
+import pandas as pd
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+DEFAULT_CHUNK_ROWS = 50000
+
+
+def _header_names(header: tuple) -> List:
+    """Name header cells the way pd.read_excel does ('Unnamed: i' for blanks, 'x.1' for duplicates)."""
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or (isinstance(value, str) and not value.strip()) else value
+        if isinstance(name, float) and name.is_integer():
+            name = int(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+class StreamingWorkbook:
+    """
+    A workbook opened once in read-only mode, from which any number of sheets
+    can be iterated row by row.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = Path(file_path)
+        self.is_xlsb = self.file_path.suffix.lower() == '.xlsb'
+        if self.is_xlsb:
+            from pyxlsb import open_workbook
+            self._workbook = open_workbook(str(self.file_path))
+        else:
+            import openpyxl
+            self._workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+
+    def rows(self, sheet_name=0) -> Iterator[tuple]:
+        """Iterate over the raw cell values of one sheet."""
+        if self.is_xlsb:
+            sheet_ref = sheet_name + 1 if isinstance(sheet_name, int) else sheet_name
+            with self._workbook.get_sheet(sheet_ref) as sheet:
+                for row in sheet.rows():
+                    yield tuple(cell.v for cell in row)
+        else:
+            sheet = self._workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else self._workbook[sheet_name]
+            yield from sheet.iter_rows(values_only=True)
+
+    def close(self) -> None:
+        self._workbook.close()
+
+
+def iter_sheet_rows(file_path, sheet_name=0) -> Iterator[tuple]:
+    """Iterate over the raw cell values of a sheet without loading the whole sheet into memory."""
+    workbook = StreamingWorkbook(file_path)
+    try:
+        yield from workbook.rows(sheet_name)
+    finally:
+        workbook.close()
+
+
+def iter_sheet_chunks(file_path, sheet_name=0, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                      usecols: Optional[List] = None,
+                      workbook: Optional[StreamingWorkbook] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a sheet as a sequence of DataFrames of at most `chunk_rows` rows.
+
+    The first row is used as the header, as with pd.read_excel. Only one chunk
+    of rows is held in memory at a time, so memory stays flat regardless of the
+    sheet size. Sheets in formats without a streaming reader (.xls, .ods) are
+    read in full and then sliced. Pass an open `workbook` to avoid re-opening
+    the file for every sheet.
+    """
+    file_path = Path(file_path)
+    if file_path.suffix.lower() not in ('.xlsx', '.xlsm', '.xlsb'):
+        df = pd.read_excel(file_path, sheet_name=sheet_name, usecols=usecols)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
+        return
+
+    rows = workbook.rows(sheet_name) if workbook is not None else iter_sheet_rows(file_path, sheet_name)
+    header = next(rows, None)
+    if header is None:
+        return
+    names = _header_names(header)
+    width = len(names)
+    keep = [i for i, name in enumerate(names) if usecols is None or name in usecols]
+    columns = [names[i] for i in keep]
+
+    buffer = []
+    blank_rows = 0
+    for row in rows:
+        if all(value is None for value in row):
+            # Trailing blank rows are dropped, like pd.read_excel; inner ones are kept
+            blank_rows += 1
+            continue
+        if blank_rows:
+            buffer.extend([(None,) * len(keep)] * blank_rows)
+            blank_rows = 0
+        if len(row) < width:
+            row = row + (None,) * (width - len(row))
+        buffer.append(tuple(row[i] for i in keep))
+        if len(buffer) >= chunk_rows:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+            buffer = []
+    if buffer:
+        yield pd.DataFrame.from_records(buffer, columns=columns)
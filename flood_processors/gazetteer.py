@@ -0,0 +1,211 @@
+import os
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from flood_processors.categoricals import categorical_from_codes
+from flood_processors.geocoder import LATITUDE_COLUMNS, LATITUDE_RANGE, LONGITUDE_COLUMNS, LONGITUDE_RANGE, _pick_column
+from flood_processors.hashing import file_sha256
+
+# Bump when name matching changes, so results are re-geocoded
+GAZETTEER_VERSION = 1
+
+DEFAULT_GAZETTEER_PATH = Path(__file__).parent.parent / '.cache' / 'gazetteer.csv'
+
+# Column names used by the common open place name datasets (ONS Index of Place Names, OS Open Names, ...)
+NAME_COLUMNS = ['name', 'place', 'placename', 'place_name', 'place18nm', 'place22nm', 'name1']
+REGION_COLUMNS = ['county', 'cty', 'ctyhistnm', 'county_unitary', 'district', 'lad', 'lad22nm', 'local_authority']
+
+# Lowest trigram similarity (Dice coefficient) at which a misspelt name still matches a place
+FUZZY_THRESHOLD = 0.75
+
+# Free text such as 'Rear of 12 High St, Derby' names the town in one of its parts
+PART_SEPARATORS = r'[,;/()]'
+
+
+def normalize_place_names(values) -> pd.Series:
+    """
+    Case-, punctuation- and whitespace-insensitive form of place names, e.g.
+    "St. Albans" and "ST ALBANS" both give 'saint albans', "King's Lynn"
+    gives 'kings lynn' and 'Stoke-on-Trent' gives 'stoke on trent'.
+    """
+    text = pd.Series(values, copy=False).astype('string').str.casefold()
+    text = text.str.replace(r"['’]", '', regex=True).str.replace('&', ' and ', regex=False)
+    text = text.str.replace(r'[\W_]+', ' ', regex=True).str.strip()
+    text = text.str.replace(r'\bste?\b', 'saint', regex=True)
+    return text.mask(text == '')
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f'  {key} '
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class TownGazetteer:
+    """
+    Free-text town name -> canonical place and coordinates, from a local
+    gazetteer CSV (place names with latitude and longitude, optionally a
+    county or district column to tell places of the same name apart).
+
+    The index is built once, on first use: names are normalized (see
+    normalize_place_names) and looked up exactly, and a trigram index serves
+    misspelt names. Lookups work on whole columns and resolve each distinct
+    (name, region) string once; results are memoized for the lifetime of the
+    gazetteer, so the work grows with the number of distinct town strings
+    rather than with the number of records.
+    """
+
+    def __init__(self, path=None, name_column: Optional[str] = None, latitude_column: Optional[str] = None,
+                 longitude_column: Optional[str] = None, region_column: Optional[str] = None):
+        self.path = Path(path or os.environ.get('FLOOD_GAZETTEER', DEFAULT_GAZETTEER_PATH))
+        if not self.path.exists():
+            raise FileNotFoundError(f"No gazetteer at {self.path}; set FLOOD_GAZETTEER to a CSV of place names "
+                                    f"with latitude and longitude")
+        self._columns = (name_column, latitude_column, longitude_column, region_column)
+        self._hash = None
+        self._loaded = False
+        self._memo: Dict[Tuple, int] = {}
+
+    @staticmethod
+    def exists(path=None) -> bool:
+        return Path(path or os.environ.get('FLOOD_GAZETTEER', DEFAULT_GAZETTEER_PATH)).exists()
+
+    @property
+    def hash(self) -> str:
+        if self._hash is None:
+            self._hash = hashlib.sha256(f"{GAZETTEER_VERSION}:{file_sha256(self.path)}".encode()).hexdigest()
+        return self._hash
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        name_column, latitude_column, longitude_column, region_column = self._columns
+        header = pd.read_csv(self.path, nrows=0).columns
+        name_column = _pick_column(header, NAME_COLUMNS, name_column, 'place name')
+        latitude_column = _pick_column(header, LATITUDE_COLUMNS, latitude_column, 'latitude')
+        longitude_column = _pick_column(header, LONGITUDE_COLUMNS, longitude_column, 'longitude')
+        try:
+            region_column = _pick_column(header, REGION_COLUMNS, region_column, 'region')
+        except ValueError:
+            region_column = None
+
+        columns = [name_column, latitude_column, longitude_column] + ([region_column] if region_column else [])
+        df = pd.read_csv(self.path, usecols=columns, dtype={name_column: str}, low_memory=False)
+        latitude = pd.to_numeric(df[latitude_column], errors='coerce')
+        longitude = pd.to_numeric(df[longitude_column], errors='coerce')
+        keys = normalize_place_names(df[name_column])
+        valid = (latitude.between(*LATITUDE_RANGE) & longitude.between(*LONGITUDE_RANGE) & keys.notna()).to_numpy()
+
+        self.names = df[name_column].to_numpy(dtype=object)[valid]
+        self.keys = keys.to_numpy(dtype=object)[valid]
+        self.coords = np.column_stack([latitude[valid], longitude[valid]]).astype(np.float32)
+        self.regions = (normalize_place_names(df[region_column]).to_numpy(dtype=object)[valid]
+                        if region_column else None)
+
+        # Exact lookup: every place id of each normalized name, in file order
+        key_codes, unique_keys = pd.factorize(self.keys)
+        order = np.argsort(key_codes, kind='stable')
+        starts = np.searchsorted(key_codes[order], np.arange(1, len(unique_keys)))
+        self._exact = dict(zip(unique_keys, np.split(order, starts)))
+
+        # Trigram postings: the ids of the places containing each trigram, stored as one sorted array
+        grams = pd.Series([_trigrams(key) for key in self.keys], dtype=object).explode()
+        gram_codes, self._grams = pd.factorize(grams.to_numpy(dtype=object))
+        order = np.argsort(gram_codes, kind='stable')
+        self._postings = grams.index.to_numpy()[order]
+        self._offsets = np.searchsorted(gram_codes[order], np.arange(len(self._grams) + 1))
+        self._gram_index = pd.Index(self._grams)
+        self._gram_counts = np.bincount(grams.index.to_numpy(), minlength=len(self.keys))
+        self._loaded = True
+        logging.info(f"Indexed {len(self.keys)} places from {self.path.name}")
+
+    def _choose(self, ids: np.ndarray, region: Optional[str]) -> int:
+        """The place of `region` among places sharing a name, otherwise the first one listed."""
+        if len(ids) > 1 and region and self.regions is not None:
+            in_region = ids[self.regions[ids] == region]
+            if len(in_region):
+                return int(in_region[0])
+        return int(ids[0])
+
+    def _fuzzy(self, key: str, region: Optional[str]) -> int:
+        grams = self._gram_index.get_indexer(_trigrams(key))
+        grams = grams[grams >= 0]
+        if not len(grams):
+            return -1
+        shared = np.bincount(np.concatenate(
+            [self._postings[self._offsets[gram]:self._offsets[gram + 1]] for gram in grams]), minlength=len(self.keys))
+        candidates = np.flatnonzero(shared)
+        scores = 2 * shared[candidates] / (len(_trigrams(key)) + self._gram_counts[candidates])
+        best = scores.max()
+        if best < FUZZY_THRESHOLD:
+            return -1
+        return self._choose(candidates[scores == best], region)
+
+    def _match(self, keys: List[str], region: Optional[str]) -> int:
+        """Place of the first candidate key that names one exactly, otherwise of the closest misspelling."""
+        for key in keys:
+            if key in self._exact:
+                return self._choose(self._exact[key], region)
+        for key in keys:
+            place = self._fuzzy(key, region)
+            if place >= 0:
+                return place
+        return -1
+
+    def _resolve_new(self, pairs: List[Tuple]) -> None:
+        """Resolve (name, region) pairs not seen before, normalizing all of their text in one pass."""
+        names = pd.Series([name for name, _ in pairs], dtype=object)
+        # The whole name first, then its parts from the last one ('..., Derby')
+        parts = names.str.split(PART_SEPARATORS, regex=True).map(lambda split: split[::-1])
+        candidates = pd.concat([names, parts.explode()]).sort_index(kind='stable')
+        keys = normalize_place_names(candidates).dropna()
+        regions = normalize_place_names(pd.Series([region for _, region in pairs], dtype=object))
+        grouped = {i: list(dict.fromkeys(group)) for i, group in keys.groupby(level=0)}
+        for i, pair in enumerate(pairs):
+            region = regions[i] if isinstance(regions[i], str) else None
+            self._memo[pair] = self._match(grouped.get(i, []), region)
+
+    def resolve(self, names, regions=None) -> np.ndarray:
+        """Place id of each row's town name (-1 where it is missing or matches no place)."""
+        self._load()
+        names = pd.Series(names, copy=False)
+        regions = pd.Series(regions, index=names.index, dtype=object) if regions is not None else None
+        name_codes, name_values = pd.factorize(names)
+        region_codes, region_values = (pd.factorize(regions) if regions is not None
+                                       else (np.full(len(names), -1), np.array([], dtype=object)))
+
+        # One integer key per distinct (name, region) pair, with 0 standing for a missing region
+        width = len(region_values) + 1
+        pair_codes, pairs = pd.factorize(name_codes.astype(np.int64) * width + region_codes + 1)
+        pairs = [(name_values[name_code], region_values[region_code] if region_code >= 0 else None) if name_code >= 0
+                 else None for name_code, region_code in zip(pairs // width, pairs % width - 1)]
+        new = [pair for pair in pairs if pair is not None and pair not in self._memo]
+        if new:
+            self._resolve_new(new)
+        ids = np.array([self._memo[pair] if pair is not None else -1 for pair in pairs], dtype=np.int64)
+        return ids[pair_codes]
+
+    def lookup(self, names, regions=None) -> pd.DataFrame:
+        """
+        Resolve a column of town names. Returns the canonical `place` name (a
+        categorical) and its float32 `latitude` / `longitude`, all missing
+        where no place matched.
+        """
+        names = pd.Series(names, copy=False)
+        return self.places(self.resolve(names, regions), names.index)
+
+    def places(self, ids: np.ndarray, index=None) -> pd.DataFrame:
+        """Canonical name and coordinates of place ids as returned by resolve (missing for -1)."""
+        self._load()
+        used, codes = np.unique(ids, return_inverse=True)
+        codes = codes.ravel() - (1 if len(used) and used[0] < 0 else 0)
+        used = used[used >= 0]
+        coords = np.vstack([self.coords[used], np.full((1, 2), np.nan, dtype=np.float32)])
+        return pd.DataFrame({
+            'place': categorical_from_codes(codes, self.names[used]),
+            'latitude': coords[codes, 0],
+            'longitude': coords[codes, 1],
+        }, index=index)
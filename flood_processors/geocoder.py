@@ -0,0 +1,302 @@
+import os
+import json
+import shutil
+import logging
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from flood_processors.hashing import file_sha256
+from flood_processors.postcodes import POSTCODE_LEVELS, parse_postcodes, postcode_keys
+from flood_processors.stages import ResultStage, set_column
+
+# Bump when the on-disk index layout changes
+INDEX_VERSION = 1
+
+DEFAULT_INDEX_DIR = Path(__file__).parent.parent / '.cache' / 'postcodes'
+GEOCODE_REPORT_PATH = 'results/geocode_summary.csv'
+
+# How precisely a record was placed: a postcode level, or the town gazetteer's 'place'
+GEO_PRECISIONS = [*POSTCODE_LEVELS, 'place']
+
+# Longest key is a full postcode such as 'SW1A 1AA'
+KEY_DTYPE = 'S8'
+
+# Column names used by the common open postcode datasets (ONS Postcode Directory, Code-Point Open extracts, ...)
+POSTCODE_COLUMNS = ['postcode', 'pcds', 'pcd', 'pcd2', 'post code']
+LATITUDE_COLUMNS = ['latitude', 'lat']
+LONGITUDE_COLUMNS = ['longitude', 'long', 'lon', 'lng']
+
+# Rough bounding box of the UK; the ONS directory uses 99.999999 for postcodes without a location
+LATITUDE_RANGE = (49.0, 61.0)
+LONGITUDE_RANGE = (-9.0, 3.0)
+
+
+def _pick_column(columns, candidates: List[str], requested: Optional[str], what: str) -> str:
+    if requested:
+        return requested
+    by_name = {str(column).strip().lower(): column for column in columns}
+    for candidate in candidates:
+        if candidate in by_name:
+            return by_name[candidate]
+    raise ValueError(f"Could not find a {what} column among {list(columns)}; pass it explicitly")
+
+
+def build_postcode_index(source, index_dir=None, postcode_column: Optional[str] = None,
+                         latitude_column: Optional[str] = None, longitude_column: Optional[str] = None) -> Dict:
+    """
+    Build the geocoder index from a CSV of postcode centroids.
+
+    For every level (unit, sector, district, area) a sorted array of keys and
+    a matching array of (latitude, longitude) centroids are saved as .npy
+    files; coarser levels are the mean of the unit centroids they contain.
+    The index is written to a temporary folder and swapped into place.
+    """
+    source = Path(source)
+    index_dir = Path(index_dir or os.environ.get('FLOOD_POSTCODE_INDEX', DEFAULT_INDEX_DIR))
+    header = pd.read_csv(source, nrows=0).columns
+    postcode_column = _pick_column(header, POSTCODE_COLUMNS, postcode_column, 'postcode')
+    latitude_column = _pick_column(header, LATITUDE_COLUMNS, latitude_column, 'latitude')
+    longitude_column = _pick_column(header, LONGITUDE_COLUMNS, longitude_column, 'longitude')
+
+    df = pd.read_csv(source, usecols=[postcode_column, latitude_column, longitude_column],
+                     dtype={postcode_column: str}, low_memory=False)
+    latitude = pd.to_numeric(df[latitude_column], errors='coerce')
+    longitude = pd.to_numeric(df[longitude_column], errors='coerce')
+    valid = latitude.between(*LATITUDE_RANGE) & longitude.between(*LONGITUDE_RANGE)
+
+    units = postcode_keys(df.loc[valid, postcode_column])
+    units['latitude'] = latitude[valid]
+    units['longitude'] = longitude[valid]
+    units = units.dropna(subset=['unit']).groupby('unit', observed=True, as_index=False).agg(
+        sector=('sector', 'first'), district=('district', 'first'), area=('area', 'first'),
+        latitude=('latitude', 'mean'), longitude=('longitude', 'mean'))
+    if units.empty:
+        raise ValueError(f"No valid postcodes with coordinates found in {source}")
+
+    tmp_dir = index_dir.with_name(f"{index_dir.name}.tmp-{os.getpid()}")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+    counts = {}
+    for level in POSTCODE_LEVELS:
+        centroids = units.groupby(level, observed=True, as_index=False)[['latitude', 'longitude']].mean()
+        keys = centroids[level].to_numpy(dtype=object).astype(KEY_DTYPE)
+        order = np.argsort(keys, kind='stable')
+        np.save(tmp_dir / f'{level}_keys.npy', keys[order])
+        np.save(tmp_dir / f'{level}_coords.npy',
+                centroids[['latitude', 'longitude']].to_numpy(dtype=np.float32)[order])
+        counts[level] = len(keys)
+
+    source_hash = file_sha256(source)
+    meta = {
+        'version': INDEX_VERSION,
+        'source': source.name,
+        'source_sha256': source_hash,
+        'hash': hashlib.sha256(f"{INDEX_VERSION}:{source_hash}".encode()).hexdigest(),
+        'counts': counts,
+    }
+    with open(tmp_dir / 'meta.json', 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    if index_dir.exists():
+        shutil.rmtree(index_dir)
+    os.replace(tmp_dir, index_dir)
+    logging.info(f"Built postcode index in {index_dir}: " + ', '.join(f"{n} {level}s" for level, n in counts.items()))
+    return meta
+
+
+class PostcodeGeocoder:
+    """
+    Offline postcode -> (latitude, longitude) lookup over a memory-mapped index.
+
+    The sorted key arrays are opened with mmap, so loading costs almost
+    nothing and pages are read on demand. A column is geocoded by binary
+    searching all of its distinct postcodes at once (np.searchsorted), first
+    as full postcodes and then, for whatever is still unresolved, as sectors,
+    districts and areas. The level reached is returned as `geo_precision`.
+    """
+
+    def __init__(self, index_dir=None):
+        self.index_dir = Path(index_dir or os.environ.get('FLOOD_POSTCODE_INDEX', DEFAULT_INDEX_DIR))
+        meta_path = self.index_dir / 'meta.json'
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No postcode index in {self.index_dir}; build one with build_postcode_index.py")
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"Postcode index in {self.index_dir} is outdated; rebuild it with build_postcode_index.py")
+        self._keys = {level: np.load(self.index_dir / f'{level}_keys.npy', mmap_mode='r') for level in POSTCODE_LEVELS}
+        self._coords = {level: np.load(self.index_dir / f'{level}_coords.npy', mmap_mode='r') for level in POSTCODE_LEVELS}
+
+    @staticmethod
+    def exists(index_dir=None) -> bool:
+        index_dir = Path(index_dir or os.environ.get('FLOOD_POSTCODE_INDEX', DEFAULT_INDEX_DIR))
+        return (index_dir / 'meta.json').exists()
+
+    @property
+    def hash(self) -> str:
+        return self.meta['hash']
+
+    def find(self, level: str, keys: np.ndarray) -> np.ndarray:
+        """Positions of `keys` in the index of one level, -1 where a key is not present."""
+        index = self._keys[level]
+        if not len(index) or not len(keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.searchsorted(index, keys)
+        found = index[np.minimum(positions, len(index) - 1)] == keys
+        return np.where(found, positions, -1)
+
+    def geocode(self, postcodes) -> pd.DataFrame:
+        """
+        Geocode a column of postcodes (full, sector, outward or area codes).
+        Returns float32 `latitude` / `longitude` and a categorical `geo_precision`
+        (one of POSTCODE_LEVELS), all missing where nothing matched.
+        """
+        return self.geocode_keys(postcode_keys(postcodes))
+
+    def geocode_keys(self, keys: pd.DataFrame) -> pd.DataFrame:
+        """
+        Geocode rows given as postcode keys, one column per level of
+        POSTCODE_LEVELS (see postcode_keys), falling back from the finest key
+        a row has to the coarser ones. Each level's distinct keys are searched
+        once and the positions broadcast back to the rows by category code.
+        """
+        coords = np.full((len(keys), 2), np.nan, dtype=np.float32)
+        levels = np.full(len(keys), -1, dtype=np.int8)
+        for level_code, level in enumerate(POSTCODE_LEVELS):
+            column = pd.Series(keys[level], copy=False).astype('category')
+            categories = column.cat.categories.to_numpy(dtype=object).astype(KEY_DTYPE)
+            # One extra slot at the end serves rows whose code is -1 (no key at this level)
+            positions = np.append(self.find(level, categories), -1)[column.cat.codes.to_numpy()]
+            hits = (levels < 0) & (positions >= 0)
+            coords[hits] = self._coords[level][positions[hits]]
+            levels[hits] = level_code
+
+        return pd.DataFrame({
+            'latitude': coords[:, 0],
+            'longitude': coords[:, 1],
+            'geo_precision': pd.Categorical.from_codes(levels, categories=POSTCODE_LEVELS),
+        }, index=keys.index)
+
+
+class GeocodeStage(ResultStage):
+    """
+    Results stage that fills `latitude`, `longitude` and `geo_precision` from
+    the postcode keys of the postcodes stage (or `location_postcode` without
+    them). With a corrector (see flood_processors.postcode_correction),
+    malformed postcodes and full postcodes missing from the index are
+    geocoded at their nearest valid postcode, recorded in
+    `postcode_corrected`. With a town gazetteer (see
+    flood_processors.gazetteer) it also fills the canonical `place` of each
+    record's town or district, and records without a usable postcode are
+    placed at it (`geo_precision` 'place').
+    """
+
+    name = 'geocode'
+    columns = ['latitude', 'longitude', 'geo_precision', 'postcode_corrected', 'place']
+    report_columns = ['company', 'geo_precision', 'count']
+
+    def __init__(self, geocoder: Optional[PostcodeGeocoder] = None, gazetteer=None, corrector=None,
+                 report_path: str = GEOCODE_REPORT_PATH):
+        self.geocoder = geocoder if geocoder or gazetteer else PostcodeGeocoder()
+        self.gazetteer = gazetteer
+        self.corrector = corrector
+        self.report_path = report_path
+
+    @property
+    def hash(self) -> str:
+        sources = [source.hash if source else '' for source in (self.geocoder, self.corrector, self.gazetteer)]
+        return hashlib.sha256(':'.join(sources).encode()).hexdigest()
+
+    def geocode_postcodes(self, table: pa.Table) -> pd.DataFrame:
+        postcodes = table.column('location_postcode').to_pandas()
+        if self.geocoder is None:
+            return pd.DataFrame({'latitude': np.full(len(postcodes), np.nan, dtype=np.float32),
+                                 'longitude': np.full(len(postcodes), np.nan, dtype=np.float32),
+                                 'geo_precision': pd.Categorical.from_codes(np.full(len(postcodes), -1),
+                                                                            categories=GEO_PRECISIONS),
+                                 'postcode_corrected': pd.Series(None, index=postcodes.index, dtype='string')})
+        if ('postcode_completeness' in table.column_names and
+                table.column('postcode_completeness').null_count == postcodes.isna().sum()):
+            # Every postcode has already been parsed into keys by the postcodes stage
+            columns = [f'postcode_{level}' for level in POSTCODE_LEVELS] + ['postcode_completeness']
+            parsed = table.select(columns).to_pandas().set_axis([*POSTCODE_LEVELS, 'completeness'], axis=1)
+        else:
+            parsed = parse_postcodes(postcodes)
+        geocoded = self.geocoder.geocode_keys(parsed[POSTCODE_LEVELS])
+        geocoded['postcode_corrected'] = pd.Series(None, index=postcodes.index, dtype='string')
+
+        if self.corrector is not None:
+            # Values that are not postcodes, and full postcodes the index does not know
+            completeness = parsed['completeness']
+            malformed = ((completeness == 'invalid') |
+                         ((completeness == 'unit') & (geocoded['geo_precision'] != 'unit'))).to_numpy()
+            if malformed.any():
+                corrected = self.corrector.correct(postcodes[malformed])
+                regeocoded = self.geocoder.geocode(corrected)
+                # Levels are ordered finest first; nothing matched ranks below every level
+                def rank(precision):
+                    codes = precision.cat.codes.to_numpy()
+                    return np.where(codes < 0, len(POSTCODE_LEVELS), codes)
+
+                improved = rank(regeocoded['geo_precision']) < rank(geocoded['geo_precision'][malformed])
+                rows = geocoded.index[np.flatnonzero(malformed)[improved]]
+                for column in ('latitude', 'longitude', 'geo_precision'):
+                    geocoded.loc[rows, column] = regeocoded[column].to_numpy()[improved]
+                geocoded.loc[rows, 'postcode_corrected'] = corrected.to_numpy()[improved]
+
+        geocoded['geo_precision'] = geocoded['geo_precision'].cat.set_categories(GEO_PRECISIONS)
+        return geocoded
+
+    def locate_places(self, table: pa.Table) -> pd.DataFrame:
+        """Canonical place of each record's town, or of its district where the town is missing or unknown."""
+        towns, districts, counties = (table.column(f'location_{field}').to_pandas()
+                                      for field in ('town', 'district', 'county'))
+        ids = self.gazetteer.resolve(towns, counties.fillna(districts))
+        unresolved = (ids < 0) & districts.notna().to_numpy()
+        if unresolved.any():
+            ids[unresolved] = self.gazetteer.resolve(districts[unresolved], counties[unresolved])
+        return self.gazetteer.places(ids, towns.index)
+
+    def apply(self, table: pa.Table) -> Tuple[pa.Table, pd.DataFrame]:
+        geocoded = self.geocode_postcodes(table)
+        if self.gazetteer is not None:
+            places = self.locate_places(table)
+            fallback = (geocoded['geo_precision'].isna() & places['place'].notna()).to_numpy()
+            geocoded.loc[fallback, ['latitude', 'longitude']] = places.loc[fallback, ['latitude', 'longitude']]
+            geocoded.loc[fallback, 'geo_precision'] = 'place'
+            geocoded['place'] = places['place']
+        else:
+            geocoded['place'] = pd.Categorical([None] * table.num_rows, categories=[])
+        for column in self.columns:
+            table = set_column(table, column, geocoded[column])
+
+        # Summarize how far each company's locations could be resolved
+        has_location = np.zeros(table.num_rows, dtype=bool)
+        for field in ('postcode', 'town', 'district'):
+            has_location |= table.column(f'location_{field}').is_valid().to_numpy(zero_copy_only=False)
+        precision = geocoded['geo_precision'].cat.add_categories(['unresolved']).fillna('unresolved')[has_location]
+        company = table.column('company').to_pandas()[has_location]
+        report = pd.DataFrame({'company': company.to_numpy(), 'geo_precision': precision.to_numpy()})
+        report = report.groupby(['company', 'geo_precision'], observed=True, as_index=False).size()
+        report = report.rename(columns={'size': 'count'})
+        return table, report
+
+    def report(self, reports: List[pd.DataFrame]) -> None:
+        reports = [report for report in reports if not report.empty]
+        if not reports:
+            return
+        summary = pd.concat(reports).pivot_table(index='company', columns='geo_precision', values='count',
+                                                 aggfunc='sum', fill_value=0)
+        summary = summary.reindex(columns=[level for level in [*GEO_PRECISIONS, 'unresolved'] if level in summary])
+        Path(self.report_path).parent.mkdir(parents=True, exist_ok=True)
+        summary.to_csv(self.report_path)
+
+        totals = summary.sum()
+        resolved = totals.drop('unresolved', errors='ignore').sum()
+        breakdown = ', '.join(f"{level}: {int(count)}" for level, count in totals.items())
+        logging.info(f"Geocoded {int(resolved)} of {int(totals.sum())} locations ({breakdown}); see {self.report_path}")
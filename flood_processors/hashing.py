@@ -0,0 +1,22 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, Tuple
+
+# (path, size, mtime_ns) -> digest, so a workbook read for several sheets is hashed once
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _digest_memo:
+        return _digest_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    _digest_memo[memo_key] = digest.hexdigest()
+    return _digest_memo[memo_key]
@@ -0,0 +1,173 @@
+import os
+import re
+import copy
+import json
+import queue
+import logging
+import logging.handlers
+import multiprocessing.util
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+LOG_DIR = 'logs'
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through `extra` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+# Logging set up in this process: the listener thread and the handler feeding it
+_state: Dict = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'process': record.process,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class _ConsoleFormatter(logging.Formatter):
+    """The readable console format, followed by the traceback if the record carries one."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        return f"{text}\n{record.exception}" if getattr(record, 'exception', None) else text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues a picklable copy of each record with the traceback kept as its own `exception` field."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exception = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = record.exc_text = None
+        return record
+
+
+class _ContextFilter(logging.Filter):
+    """Tags every record with the company being processed."""
+
+    def __init__(self, company: Optional[str]):
+        super().__init__()
+        self.company = company
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.company and not hasattr(record, 'company'):
+            record.company = self.company
+        return True
+
+
+def log_path(name: str, log_dir: str = LOG_DIR) -> Path:
+    slug = re.sub(r'[^\w-]+', '_', name.lower()).strip('_')
+    return Path(log_dir) / f"{slug}.jsonl"
+
+
+def configure_logging(name: str, company: Optional[str] = None, level: int = logging.INFO,
+                      log_dir: str = LOG_DIR, console: bool = True) -> None:
+    """
+    Route this process's logging through a queue.
+
+    Callers only put records on an in-memory queue; a listener thread writes
+    them as JSON lines to logs/<name>.jsonl and, in the usual readable format,
+    to the console. Calling it again with another name (e.g. the next company
+    processed in the same process) switches the log file; a forked worker
+    gets its own listener rather than the parent's.
+    """
+    if _state.get('pid') == os.getpid() and _state.get('name') == name:
+        return
+    stop_logging()
+
+    path = log_path(name, log_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = logging.FileHandler(path, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(_ConsoleFormatter(CONSOLE_FORMAT))
+        handlers.append(console_handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(_ContextFilter(company))
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    # A forked process inherits its parent's queue handler, whose listener does not exist here
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener.start()
+    _state.update(pid=os.getpid(), name=name, listener=listener, handler=queue_handler, file_handlers=handlers)
+
+    if _state.get('finalizer_pid') != os.getpid():
+        # Runs at interpreter exit, and also when a multiprocessing worker exits (which skips atexit)
+        multiprocessing.util.Finalize(None, stop_logging, exitpriority=100)
+        _state['finalizer_pid'] = os.getpid()
+
+
+def stop_logging() -> None:
+    """Write out everything still queued and close the log files."""
+    if _state.get('pid') != os.getpid() or 'listener' not in _state:
+        _state.pop('listener', None)
+        return
+    _state.pop('listener').stop()
+    logging.getLogger().removeHandler(_state.pop('handler'))
+    for handler in _state.pop('file_handlers'):
+        handler.close()
+    _state.pop('name', None)
+
+
+class ProblemCounter:
+    """
+    Counts of repeated per-row problems (e.g. unparseable dates) with a few
+    example values each.
+
+    Problems are counted per kind, file and sheet instead of being logged row
+    by row; `log_summary` then writes one warning per kind and place, with
+    the count and examples as structured fields.
+    """
+
+    def __init__(self, max_examples: int = 5):
+        self.max_examples = max_examples
+        self._problems: Dict[tuple, Dict] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._problems)
+
+    def add(self, problem: str, count: int = 1, examples=(), file=None, sheet=None) -> None:
+        key = (problem, None if file is None else Path(file).name, None if sheet is None else str(sheet))
+        entry = self._problems.setdefault(key, {'problem': key[0], 'file': key[1], 'sheet': key[2],
+                                                'count': 0, 'examples': []})
+        entry['count'] += int(count)
+        for example in examples:
+            if len(entry['examples']) >= self.max_examples:
+                break
+            if str(example) not in entry['examples']:
+                entry['examples'].append(str(example))
+
+    def summary(self) -> List[Dict]:
+        return [dict(entry) for entry in self._problems.values()]
+
+    def log_summary(self, logger: Optional[logging.Logger] = None) -> None:
+        logger = logger or logging.getLogger()
+        for entry in self._problems.values():
+            where = ' '.join(f"[{part}]" for part in (entry['file'], entry['sheet']) if part)
+            logger.warning(f"{entry['problem']}: {entry['count']} values{' in ' + where if where else ''}, "
+                           f"e.g. {entry['examples']}", extra={'event': 'problem_summary', **entry})
@@ -0,0 +1,92 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from flood_processors.hashing import file_sha256
+
+MANIFEST_PATH = 'results/manifest.json'
+MANIFEST_VERSION = 1
+
+# Files in a company folder that are not processor inputs
+IGNORED_SUFFIXES = ('.py', '.pyc', '.log')
+
+
+def framework_hash() -> str:
+    """Combined hash of the shared flood_processors code every processor depends on."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(file_sha256(path).encode())
+    return digest.hexdigest()
+
+
+def source_fingerprint(process_file: Path) -> Dict:
+    """Hashes of everything that determines a company's output: its input files and processor code."""
+    company_dir = process_file.parent
+    inputs = {}
+    for path in sorted(company_dir.rglob('*')):
+        if not path.is_file() or path.suffix in IGNORED_SUFFIXES:
+            continue
+        relative = path.relative_to(company_dir)
+        if any(part.startswith('.') or part == '__pycache__' for part in relative.parts):
+            continue
+        inputs[relative.as_posix()] = file_sha256(path)
+    return {
+        'inputs': inputs,
+        'processor': file_sha256(process_file),
+        'framework': framework_hash(),
+    }
+
+
+class BuildManifest:
+    """
+    Record of what each company's results were built from.
+
+    Maps every source folder to the fingerprint of its inputs and the output
+    it produced, so a rebuild can skip companies whose workbooks and
+    process.py are unchanged. Post-processing stages that run over all
+    results (e.g. categorization) keep their own state under `stages`.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        self.stages: Dict[str, Dict] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('sources', {})
+                self.stages = data.get('stages', {})
+
+    def is_current(self, source: str, fingerprint: Dict) -> bool:
+        """True if the source was built from exactly these inputs and its output is still present."""
+        entry = self.entries.get(source)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return False
+        return entry['output'] is None or Path(entry['output']).exists()
+
+    def get(self, source: str) -> Optional[Dict]:
+        return self.entries.get(source)
+
+    def record(self, source: str, fingerprint: Dict, result: Dict) -> None:
+        self.entries[source] = {
+            'fingerprint': fingerprint,
+            'company': result.get('company'),
+            'output': result.get('output'),
+            'records': result.get('records', 0),
+        }
+
+    def stage(self, name: str) -> Dict:
+        """Mutable state of a post-processing stage (created empty on first use)."""
+        return self.stages.setdefault(name, {})
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'sources': self.entries, 'stages': self.stages}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,219 @@
+import re
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flood_processors.categoricals import categorical_from_codes
+from flood_processors.schema import INCIDENT_FIELDS
+
+# Fields of a template such as '{Job Type} - {High Level Fault}'
+_FIELD = re.compile(r'\{([^{}]+)\}')
+
+SPEC_KEYS = {'file', 'sheets', 'engine', 'date', 'date_format', 'incident_type', 'fields', 'location',
+             'decode', 'fill', 'strip', 'skip', 'required'}
+
+
+class SourceMapping:
+    """
+    One source workbook described as configuration and compiled to whole-column
+    operations.
+
+    A spec is a plain dict:
+
+        file           the workbook, relative to the company folder
+        sheets         a sheet name or a list of sheet names with the same layout
+        engine         pandas Excel engine if not the default (e.g. 'pyxlsb')
+        date           the incident date column (omitted if the file has none)
+        date_format    format hint for standardize_dates (e.g. 'excel_serial')
+        incident_type  a column, or a template like '{Job Type} - {High Level Fault}';
+                       rows where any of its columns is empty get no incident type
+        fields         incident field -> column, e.g. {'cause': 'High Level Fault'}
+                       (see INCIDENT_FIELDS), stored as columns of their own
+        location       location field -> column, e.g. {'postcode': 'Postcode'}
+        decode         column -> {code: description} dict, or the name of the
+                       workbook's legend sheet to read the codes from
+        fill           column -> text used where the (decoded) column is empty
+        strip          strip surrounding whitespace from the incident type and field columns
+        skip           column -> regex; rows whose value matches it are dropped
+        required       columns whose empty rows are dropped
+
+    Only the columns the spec refers to are read from the workbook. Each
+    column is decoded, filled and rendered once per distinct value, and the
+    incident type is joined once per distinct combination, so neither costs a
+    string per row.
+    """
+
+    def __init__(self, spec: Dict):
+        unknown = set(spec) - SPEC_KEYS
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in the source spec for {spec.get('file')}")
+        if 'file' not in spec or 'sheets' not in spec:
+            raise ValueError(f"A source spec needs 'file' and 'sheets': {spec}")
+
+        self.file = spec['file']
+        sheets = spec['sheets']
+        self.sheets = list(sheets) if isinstance(sheets, (list, tuple)) else [sheets]
+        self.engine = spec.get('engine')
+        self.date = spec.get('date')
+        self.date_format = spec.get('date_format')
+        self.location = dict(spec.get('location') or {})
+        self.decode = dict(spec.get('decode') or {})
+        self.fill = dict(spec.get('fill') or {})
+        self.strip = spec.get('strip', False)
+        self.skip = {column: re.compile(pattern) for column, pattern in (spec.get('skip') or {}).items()}
+        self.required = list(spec.get('required') or [])
+
+        self.fields = dict(spec.get('fields') or {})
+        unknown = set(self.fields) - set(INCIDENT_FIELDS)
+        if unknown:
+            raise ValueError(f"{self.file}: unknown incident fields {sorted(unknown)}; expected {INCIDENT_FIELDS}")
+
+        template = spec.get('incident_type')
+        if template is None:
+            self.type_fields, self.type_literals = [], []
+        elif _FIELD.search(template):
+            self.type_fields = _FIELD.findall(template)
+            self.type_literals = _FIELD.split(template)[::2]
+        else:
+            self.type_fields, self.type_literals = [template], ['', '']
+
+        for column in [*self.decode, *self.fill]:
+            if column not in self.type_fields and column not in self.fields.values():
+                raise ValueError(f"{self.file}: '{column}' is decoded or filled but not part of the incident type "
+                                 f"or its fields")
+
+    @property
+    def columns(self) -> List[str]:
+        """Every column the spec refers to, i.e. the only ones that need reading."""
+        referenced = [self.date, *self.type_fields, *self.fields.values(), *self.location.values(), *self.skip,
+                      *self.required]
+        return list(dict.fromkeys(column for column in referenced if column is not None))
+
+    @property
+    def read_options(self) -> Dict:
+        options = {'usecols': self.columns}
+        if self.engine:
+            options['engine'] = self.engine
+        return options
+
+    @property
+    def legend_sheets(self) -> Dict[str, str]:
+        """Decoded columns whose codes come from a legend sheet of the workbook."""
+        return {column: codes for column, codes in self.decode.items() if isinstance(codes, str)}
+
+    def _distinct(self, df: pd.DataFrame, column: str, legends: Dict[str, Dict], text: bool):
+        codes = legends[column] if column in legends else self.decode.get(column)
+        return distinct_values(df[column], codes, text, self.strip, self.fill.get(column))
+
+    def incident_type(self, df: pd.DataFrame, legends: Optional[Dict[str, Dict]] = None) -> Optional[pd.Series]:
+        """The incident type column (categorical): decoded, filled and joined per the template."""
+        if not self.type_fields:
+            return None
+        legends = legends or {}
+        text = self.strip or len(self.type_fields) > 1 or any(self.type_literals)
+        parts = [self._distinct(df, column, legends, text) for column in self.type_fields]
+        return pd.Series(join_template(parts, self.type_literals), index=df.index)
+
+    def incident_fields(self, df: pd.DataFrame, legends: Optional[Dict[str, Dict]] = None) -> Dict[str, pd.Series]:
+        """Each incident field column as text categoricals, decoded and filled like the incident type."""
+        legends = legends or {}
+        return {field: pd.Series(categorical_from_codes(*self._distinct(df, column, legends, True)), index=df.index)
+                for field, column in self.fields.items()}
+
+    def apply(self, df: pd.DataFrame, standardize_dates: Callable, legends: Optional[Dict[str, Dict]] = None) -> Dict:
+        """
+        Compile one chunk of the sheet to the keyword arguments of
+        BaseFloodProcessor.add_records. `standardize_dates` is the processor's,
+        so unparseable dates are counted as problems.
+        """
+        missing = [column for column in self.columns if column not in df]
+        if missing:
+            raise ValueError(f"{self.file} has no columns {missing}")
+
+        keep = pd.Series(True, index=df.index)
+        for column in self.required:
+            keep &= df[column].notna()
+        for column, pattern in self.skip.items():
+            keep &= ~df[column].astype(str).str.match(pattern, na=False)
+        if not keep.all():
+            df = df[keep]
+
+        records = {'incident_date': None, 'date_precision': None,
+                   'incident_type': self.incident_type(df, legends),
+                   'fields': self.incident_fields(df, legends),
+                   'location': {field: df[column] for field, column in self.location.items()}}
+        if self.date is not None:
+            dates = standardize_dates(df[self.date], fmt=self.date_format)
+            records['incident_date'] = dates['incident_date']
+            records['date_precision'] = dates['date_precision']
+        return records
+
+
+def _render(value) -> str:
+    # A number column with blanks is read as floats, but its type 1 is still 'Type 1', not 'Type 1.0'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def distinct_values(values: pd.Series, codes: Optional[Dict] = None, text: bool = False, strip: bool = False,
+                    fill: Optional[str] = None) -> Tuple[np.ndarray, pd.Series]:
+    """
+    Factorize a column and decode, render, strip and fill its distinct values
+    only. Returns each row's code and the transformed values; the last value
+    stands for rows that were missing.
+    """
+    row_codes, uniques = pd.factorize(values)
+    uniques = pd.concat([pd.Series(uniques, dtype=object), pd.Series([None], dtype=object)], ignore_index=True)
+    row_codes = np.where(row_codes < 0, len(uniques) - 1, row_codes)
+    if codes is not None:
+        uniques = uniques.map(codes)
+    if text:
+        uniques = uniques.map(lambda value: _render(value).strip() if strip else _render(value), na_action='ignore')
+    if fill is not None:
+        uniques = uniques.fillna(fill)
+    return row_codes, uniques
+
+
+def join_template(parts: List[Tuple[np.ndarray, pd.Series]], literals: List[str]) -> pd.Categorical:
+    """
+    Join factorized parts (see distinct_values) with the literal text around
+    them, e.g. literals ['', ' - ', ''] for '{A} - {B}'. Each distinct
+    combination of parts is joined once; rows where any part is missing are
+    missing.
+    """
+    if len(parts) == 1 and not any(literals):
+        return categorical_from_codes(*parts[0])
+
+    row_combos = parts[0][0]
+    for row_codes, uniques in parts[1:]:
+        row_combos = pd.factorize(row_combos * len(uniques) + row_codes)[0]
+    row_combos, _ = pd.factorize(row_combos)
+    # Codes are numbered in order of first appearance, so these rows hold combination 0, 1, ...
+    first_rows = np.unique(row_combos, return_index=True)[1]
+
+    values = [pd.Series(uniques.to_numpy(dtype=object)[row_codes[first_rows]]) for row_codes, uniques in parts]
+    complete = pd.concat(values, axis=1).notna().all(axis=1)
+    joined = literals[0] + values[0].astype(object).where(complete, '')
+    for literal, part in zip(literals[1:], values[1:]):
+        joined = joined + literal + part.astype(object).where(complete, '')
+    joined = (joined + literals[-1]).where(complete, None)
+    return categorical_from_codes(row_combos, joined)
+
+
+def compile_sources(specs: List[Dict]) -> List[SourceMapping]:
+    """Validate and compile a processor's source specs."""
+    return [spec if isinstance(spec, SourceMapping) else SourceMapping(spec) for spec in specs]
+
+
+def unmapped_workbooks(data_dir, mappings: List[SourceMapping]) -> List[str]:
+    """Workbooks in a company folder (and below it) that no spec describes."""
+    data_dir = Path(data_dir)
+    mapped = {str(Path(mapping.file)) for mapping in mappings}
+    found = []
+    for path in sorted(data_dir.rglob('*.xls*')):
+        relative = str(path.relative_to(data_dir))
+        if not path.name.startswith(('.', '~$')) and relative not in mapped:
+            found.append(relative)
+    return found
@@ -0,0 +1,251 @@
+import os
+import re
+import sys
+import time
+import inspect
+import logging
+import traceback
+import importlib.util
+from datetime import datetime, timezone
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from flood_processors.base_processor import BaseFloodProcessor
+from flood_processors.manifest import BuildManifest, source_fingerprint
+from flood_processors.categories import CategoryLookup, CategoryStage
+from flood_processors.classifier import ClassifierStage, IncidentTypeClassifier
+from flood_processors.geocoder import GeocodeStage, PostcodeGeocoder
+from flood_processors.gazetteer import TownGazetteer
+from flood_processors.postcode_correction import PostcodeCorrector
+from flood_processors.postcodes import PostcodeStage
+from flood_processors.pyramid import HeatmapPyramid, PYRAMID_DIR
+from flood_processors.dataset import compact_dataset, partition_fingerprint
+from flood_processors.cube import update_cube
+from flood_processors.dedup import covered_outputs, update_duplicates
+from flood_processors.stages import run_result_stages
+from flood_processors.profiling import StageProfiler, save_run_report
+
+
+def load_process_module(process_file: Path):
+    """Import a company's process.py under a unique module name."""
+    slug = re.sub(r'\W+', '_', process_file.parent.name.lower()).strip('_')
+    module_name = f"flood_source_{slug}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, process_file)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def input_size(company_dir: Path) -> int:
+    """Total size of the source files in a company folder (used to schedule big jobs first)."""
+    return sum(f.stat().st_size for f in company_dir.rglob('*') if f.is_file() and f.name != 'process.py')
+
+
+def discover_processors(source_dir: str = 'source') -> List[Dict]:
+    """
+    Find every BaseFloodProcessor subclass defined in source/<Company>/process.py.
+    Returns one job description per processor class.
+    """
+    jobs = []
+    for process_file in sorted(Path(source_dir).glob('*/process.py')):
+        module = load_process_module(process_file)
+        for name, obj in vars(module).items():
+            if (inspect.isclass(obj) and issubclass(obj, BaseFloodProcessor)
+                    and obj is not BaseFloodProcessor and obj.__module__ == module.__name__):
+                jobs.append({
+                    'source': process_file.parent.name,
+                    'path': str(process_file),
+                    'class_name': name,
+                    'input_bytes': input_size(process_file.parent),
+                })
+    return jobs
+
+
+def run_processor(job: Dict) -> Dict:
+    """Run a single company processor; never raises so the pool can collect every outcome."""
+    result = {'source': job['source'], 'class_name': job['class_name'], 'company': None,
+              'status': 'ok', 'records': 0, 'output': None, 'seconds': 0.0, 'error': None}
+    start = time.perf_counter()
+    try:
+        module = load_process_module(Path(job['path']))
+        processor = getattr(module, job['class_name'])()
+        result['company'] = processor.company_name
+        if job.get('chunk_rows'):
+            processor.enable_streaming(chunk_rows=job['chunk_rows'])
+        processor.process()
+        result['records'] = len(processor.standardized_data)
+        result['output'] = processor.output_path
+        result['run_report'] = processor.run_report_path
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_pipeline(source_dir: str = 'source', workers: Optional[int] = None,
+                 sources: Optional[List[str]] = None, incremental: bool = True,
+                 chunk_rows: Optional[int] = None, profiler: Optional[StageProfiler] = None) -> List[Dict]:
+    """
+    Run every discovered company processor in a process pool.
+
+    Jobs are submitted largest-input first so the slowest company starts
+    immediately. Each processor replaces its own company=<name> partition of
+    the results dataset atomically, so a failing company leaves its previous
+    output untouched. With `incremental`,
+    companies whose inputs and processor code match the build manifest are
+    skipped and their existing results reused. Passing `chunk_rows` runs every
+    processor in streaming mode, reading and writing that many rows at a time.
+    Once the processors have finished, records listed by more than one
+    release are removed (see flood_processors.dedup; companies that lost
+    records to a company being rebuilt are rebuilt with it), the results
+    stages (categories, postcode keys, geocoding) fill in their columns in
+    every results file that needs it, partitions split over more files than
+    needed are compacted, the cube slices of changed companies are
+    recomputed, and the heatmap pyramid is rebuilt if any geocoded results
+    changed. Each of these steps is timed
+    as a stage of `profiler`; the stages and every processor's outcome (with
+    the path of its own run report) are saved as the pipeline's run report.
+    """
+    jobs = discover_processors(source_dir)
+    if sources:
+        jobs = [job for job in jobs if job['source'] in sources]
+    jobs.sort(key=lambda job: job['input_bytes'], reverse=True)
+    if not jobs:
+        return []
+
+    manifest = BuildManifest()
+    for job in jobs:
+        job['chunk_rows'] = chunk_rows
+        job['fingerprint'] = source_fingerprint(Path(job['path']))
+    pending = [job for job in jobs if not (incremental and manifest.is_current(job['source'], job['fingerprint']))]
+    pending.extend(covered_jobs(jobs, pending, manifest))
+
+    results = []
+    for job in jobs:
+        if job not in pending:
+            entry = manifest.get(job['source'])
+            results.append({'source': job['source'], 'class_name': job['class_name'],
+                            'company': entry['company'], 'status': 'unchanged', 'records': entry['records'],
+                            'output': entry['output'], 'seconds': 0.0, 'error': None})
+
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    profiler = profiler or StageProfiler()
+    if pending:
+        with profiler.stage('processors') as record:
+            results.extend(_run_jobs(pending, workers))
+            record['rows'] = sum(result['records'] for result in results if result['status'] == 'ok')
+        fingerprints = {job['source']: job['fingerprint'] for job in pending}
+        for result in results:
+            if result['status'] == 'ok' and result['source'] in fingerprints:
+                manifest.record(result['source'], fingerprints[result['source']], result)
+
+    total_records = sum(result['records'] for result in results if result['status'] != 'failed')
+    with profiler.stage('dedup', total_records):
+        changed = [result['output'] for result in results if result['status'] == 'ok' and result['output']]
+        total_records -= update_duplicates(current_outputs(results, manifest), changed, manifest.stage('dedup'),
+                                           total_records)
+    stages = result_stages()
+    with profiler.stage('result_stages', total_records):
+        run_result_stages(results, manifest, stages)
+    with profiler.stage('compaction', total_records):
+        compact_dataset()
+
+    outputs = current_outputs(results, manifest)
+    fingerprints = {output: partition_fingerprint(output) for output in outputs}
+    with profiler.stage('cube', total_records):
+        update_cube(outputs, manifest.stage('cube').setdefault('outputs', {}), fingerprints)
+    if any(isinstance(stage, GeocodeStage) for stage in stages):
+        with profiler.stage('pyramid', total_records):
+            update_pyramid(outputs, fingerprints, manifest)
+    manifest.save()
+
+    results.sort(key=lambda result: result['source'])
+    save_run_report('pipeline', {
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - start, 3),
+        'records': total_records,
+        'stages': profiler.stages,
+        'processors': [{key: value for key, value in result.items() if key != 'traceback'} for result in results],
+    }, started_at)
+    return results
+
+
+def covered_jobs(jobs: List[Dict], pending: List[Dict], manifest: BuildManifest) -> List[Dict]:
+    """
+    Jobs not otherwise due whose companies lost duplicate records to a company
+    about to be rebuilt; they are rebuilt too, so no record is lost for good.
+    """
+    changed = [manifest.get(job['source'])['output'] for job in pending if manifest.get(job['source'])]
+    covered = set(covered_outputs(manifest.stage('dedup'), changed))
+    jobs = [job for job in jobs if job not in pending and manifest.get(job['source'])['output'] in covered]
+    for job in jobs:
+        logging.info(f"Reprocessing {job['source']}: it shares records with a company being rebuilt")
+    return jobs
+
+
+def result_stages() -> List:
+    """Post-processing stages applied to every results file; geocoding needs a postcode index or a gazetteer."""
+    # The classifier only fills in categories incidents.csv lacks, and the geocoder reads the postcode keys,
+    # so each comes after the stage it builds on
+    lookup = CategoryLookup()
+    stages = [CategoryStage(lookup), ClassifierStage(IncidentTypeClassifier(lookup)), PostcodeStage()]
+    geocoder = PostcodeGeocoder() if PostcodeGeocoder.exists() else None
+    gazetteer = TownGazetteer() if TownGazetteer.exists() else None
+    if geocoder is None:
+        logging.info("No postcode index found, skipping postcode geocoding (see build_postcode_index.py)")
+    if gazetteer is None:
+        logging.info("No gazetteer found, skipping town geocoding (set FLOOD_GAZETTEER)")
+    if geocoder or gazetteer:
+        stages.append(GeocodeStage(geocoder, gazetteer, PostcodeCorrector(geocoder) if geocoder else None))
+    return stages
+
+
+def current_outputs(results: List[Dict], manifest: BuildManifest) -> List[str]:
+    """Results partitions of every company built so far, not only the ones selected for this run."""
+    outputs = {entry['output'] for entry in manifest.entries.values()} | {result['output'] for result in results}
+    return sorted(output for output in outputs if output and Path(output).exists())
+
+
+def update_pyramid(outputs: List[str], fingerprints: Dict[str, Dict], manifest: BuildManifest,
+                   path: str = PYRAMID_DIR) -> None:
+    """Rebuild the heatmap pyramid when any results changed since it was last built."""
+    state = manifest.stage('pyramid')
+    if state.get('inputs') == fingerprints and Path(path, 'meta.json').exists():
+        return
+    HeatmapPyramid.from_results(outputs).save(path)
+    state['inputs'] = fingerprints
+    logging.info(f"Rebuilt heatmap pyramid in {path} from {len(outputs)} companies")
+
+
+def _run_jobs(jobs: List[Dict], workers: Optional[int]) -> List[Dict]:
+    """Run processor jobs in a process pool and collect their outcomes."""
+    workers = workers or os.cpu_count() or 1
+    pool_kwargs = {'max_workers': min(workers, len(jobs))}
+    if sys.version_info >= (3, 11):
+        # A fresh process per company keeps log handlers and memory from leaking between companies
+        pool_kwargs['max_tasks_per_child'] = 1
+
+    results = []
+    with ProcessPoolExecutor(**pool_kwargs) as pool:
+        futures = {pool.submit(run_processor, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory)
+                result = {'source': job['source'], 'class_name': job['class_name'], 'company': None,
+                          'status': 'failed', 'records': 0, 'output': None, 'seconds': 0.0,
+                          'error': f"{type(e).__name__}: {e}"}
+            if result['status'] == 'failed':
+                logging.error(f"{result['source']} failed: {result['error']}")
+            results.append(result)
+    return results
+
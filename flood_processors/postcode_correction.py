@@ -0,0 +1,136 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from flood_processors.geocoder import KEY_DTYPE, PostcodeGeocoder
+
+# Bump when the correction rules change, so cached corrections and geocoded results are redone
+CORRECTION_VERSION = 1
+
+CORRECTIONS_FILE = 'corrections.json'
+
+ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+# Characters mixed up when keying postcodes, mapped to what a position can hold
+_TO_DIGIT = str.maketrans('OISZB', '01528')
+_TO_LETTER = str.maketrans('01528', 'OISZB')
+
+# Distinct values whose candidate postcodes are searched in one batch
+BATCH_VALUES = 2000
+
+
+def _compact(value: str) -> str:
+    return ''.join(value.upper().split())
+
+
+def repair_confusables(compact: str) -> str:
+    """
+    Fix O/0-style swaps where the position decides between a letter and a
+    digit: a postcode starts with a letter, and its inward code is a digit
+    followed by two letters (e.g. 'SW1AIA0' -> 'SW1A1AO').
+    """
+    if not 5 <= len(compact) <= 7:
+        return compact
+    outward, inward = compact[:-3], compact[-3:]
+    return (outward[0].translate(_TO_LETTER) + outward[1:] +
+            inward[0].translate(_TO_DIGIT) + inward[1:].translate(_TO_LETTER))
+
+
+def single_edits(compact: str) -> List[str]:
+    """Every string one deletion, substitution, insertion or transposition away from `compact`."""
+    splits = [(compact[:i], compact[i:]) for i in range(len(compact) + 1)]
+    return ([left + right[1:] for left, right in splits if right] +
+            [left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1] +
+            [left + char + right[1:] for left, right in splits if right for char in ALPHABET] +
+            [left + char + right for left, right in splits for char in ALPHABET])
+
+
+def _spaced(compact: str) -> str:
+    return f"{compact[:-3]} {compact[-3:]}"
+
+
+class PostcodeCorrector:
+    """
+    Proposes the valid postcode a malformed one was meant to be, against the
+    units of the postcode index.
+
+    Each distinct value is first repaired for letter/digit swaps (O/0, I/1,
+    S/5, ...), then every string within one edit of it is generated and the
+    whole batch is binary searched in the sorted, memory-mapped unit keys at
+    once, so no index beyond the geocoder's own is needed. A value is
+    corrected to the unit when exactly one matches, or to the sector when the
+    matches all share one (typically a truncated postcode). Corrections are
+    cached in the index folder, so each value is searched once per index.
+    """
+
+    def __init__(self, geocoder: PostcodeGeocoder):
+        self.geocoder = geocoder
+        self.cache_path = geocoder.index_dir / CORRECTIONS_FILE
+        self._corrections: Dict[str, Optional[str]] = {}
+        if self.cache_path.exists():
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            if cached.get('version') == CORRECTION_VERSION and cached.get('index') == geocoder.hash:
+                self._corrections = cached['corrections']
+
+    @property
+    def hash(self) -> str:
+        return f"corrections-{CORRECTION_VERSION}"
+
+    def correct(self, postcodes) -> pd.Series:
+        """Corrected postcode (unit or sector key) of each value, missing where none could be proposed."""
+        postcodes = pd.Series(postcodes, copy=False)
+        codes, uniques = pd.factorize(postcodes)
+        compacts = [_compact(str(value)) for value in uniques]
+        new = list(dict.fromkeys(compact for compact in compacts if compact not in self._corrections))
+        for start in range(0, len(new), BATCH_VALUES):
+            self._corrections.update(self.propose(new[start:start + BATCH_VALUES]))
+        if new:
+            self._save()
+        corrected = np.array([self._corrections[compact] for compact in compacts] + [None], dtype=object)
+        return pd.Series(corrected[codes], index=postcodes.index, dtype='string')
+
+    def propose(self, compacts: List[str]) -> Dict[str, Optional[str]]:
+        """Correction of each compact (space-free, upper-case) value, searching all of their candidates at once."""
+        owners, candidates, tiers = [], [], []
+        for i, compact in enumerate(compacts):
+            repaired = repair_confusables(compact)
+            # The value as it is, with its letter/digit swaps repaired, then anything one edit away
+            for tier, edits in enumerate([[compact], [repaired], {*single_edits(compact), *single_edits(repaired)}]):
+                # Only ASCII candidates of a postcode's length can be in the index (and fit its keys)
+                edits = [edit for edit in edits if 5 <= len(edit) <= 7 and edit.isascii()]
+                owners.extend([i] * len(edits))
+                tiers.extend([tier] * len(edits))
+                candidates.extend(_spaced(edit) for edit in edits)
+
+        corrections = {compact: None for compact in compacts}
+        if not candidates:
+            return corrections
+        keys = np.array(candidates, dtype=object)
+        found = self.geocoder.find('unit', keys.astype(KEY_DTYPE)) >= 0
+        hits = pd.DataFrame({'owner': np.asarray(owners)[found], 'unit': keys[found], 'tier': np.asarray(tiers)[found]})
+        # Only the matches of the closest tier count
+        hits = hits[hits['tier'] == hits.groupby('owner')['tier'].transform('min')]
+
+        for owner, units in hits.groupby('owner')['unit']:
+            units = units.unique()
+            sectors = {unit[:-2] for unit in units}
+            if len(units) == 1:
+                corrections[compacts[owner]] = units[0]
+            elif len(sectors) == 1:
+                corrections[compacts[owner]] = sectors.pop()
+        return corrections
+
+    def _save(self) -> None:
+        tmp_path = self.cache_path.with_name(f".{self.cache_path.name}.tmp-{os.getpid()}")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CORRECTION_VERSION, 'index': self.geocoder.hash,
+                           'corrections': self._corrections}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            # The index folder may be read-only; corrections are then redone next run
+            logging.debug(f"Could not cache postcode corrections in {self.cache_path}: {e}")
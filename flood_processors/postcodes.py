@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from typing import List, Tuple
+
+from flood_processors.categoricals import categorical_from_codes
+from flood_processors.stages import ResultStage, set_column
+
+# A complete UK postcode (outward and inward code), e.g. SW1A 1AA
+UK_POSTCODE_PATTERN = r'^[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}$'
+
+# A UK postcode split into its parts, e.g. SW1A 1AA -> area SW, district 1A, sector 1, unit AA.
+# The inward part is optional so outward codes (SW1A) and sectors (SW1A 1) are recognised too.
+POSTCODE_PARTS_PATTERN = r'^(?P<area>[A-Z]{1,2})(?P<district>\d[A-Z\d]?) ?(?:(?P<sector>\d)(?P<unit>[A-Z]{2})?)?$'
+
+# Resolution levels from finest to coarsest
+POSTCODE_LEVELS = ['unit', 'sector', 'district', 'area']
+
+# Completeness of a postcode value: the finest level it reaches, or invalid if it is not a postcode at all
+POSTCODE_COMPLETENESS = ['unit', 'sector', 'district', 'invalid']
+
+POSTCODE_REPORT_PATH = 'results/postcode_summary.csv'
+
+# Bump when normalization or decomposition changes, so results are re-parsed
+POSTCODE_STAGE_VERSION = 1
+
+
+def normalize_postcodes(values) -> pd.Series:
+    """
+    Upper-case postcodes and re-space them: whitespace collapses to a single
+    space, and a complete postcode written without one ('SW1A1AA') gets the
+    space between its outward and inward codes.
+    """
+    values = pd.Series(values, copy=False)
+    text = values.astype('string').str.upper().str.replace(r'\s+', ' ', regex=True).str.strip()
+    compact = text.str.replace(' ', '', regex=False)
+    complete = compact.str.fullmatch(UK_POSTCODE_PATTERN).fillna(False).to_numpy(dtype=bool)
+    text = text.mask(complete, compact.str[:-3] + ' ' + compact.str[-3:])
+    return text.mask(text == '')
+
+
+def parse_postcodes(values) -> pd.DataFrame:
+    """
+    Validate and decompose a column of postcodes in one pass over its
+    distinct values. Returns the normalized `postcode`, its keys at each of
+    POSTCODE_LEVELS (e.g. SW1A 1AA gives unit 'SW1A 1AA', sector 'SW1A 1',
+    district 'SW1A' and area 'SW'; levels a value does not reach are missing)
+    and its `completeness` (see POSTCODE_COMPLETENESS; missing for missing
+    values). Every column is a categorical, so repeated keys are stored (and
+    grouped) as codes.
+    """
+    values = pd.Series(values, copy=False)
+    # Postcodes repeat a lot, so each distinct value is parsed once and broadcast back
+    codes, uniques = pd.factorize(values)
+    normalized = normalize_postcodes(pd.Series(uniques, dtype=object))
+    parts = normalized.str.extract(POSTCODE_PARTS_PATTERN)
+    district = parts['area'] + parts['district']
+    sector = district + ' ' + parts['sector']
+    levels = {'unit': sector + parts['unit'], 'sector': sector, 'district': district, 'area': parts['area']}
+
+    completeness = pd.Series('invalid', index=normalized.index, dtype=object).mask(normalized.isna())
+    for level in reversed(POSTCODE_COMPLETENESS[:-1]):
+        completeness = completeness.mask(levels[level].notna(), level)
+
+    columns = {'postcode': normalized, **levels, 'completeness': completeness}
+    return pd.DataFrame({name: categorical_from_codes(codes, keys) for name, keys in columns.items()},
+                        index=values.index)
+
+
+def postcode_keys(values) -> pd.DataFrame:
+    """
+    Decompose a column of postcodes into the key of each of POSTCODE_LEVELS
+    (see parse_postcodes).
+    """
+    return parse_postcodes(values)[POSTCODE_LEVELS]
+
+
+class PostcodeStage(ResultStage):
+    """
+    Results stage that fills the `postcode_<level>` keys and
+    `postcode_completeness` from `location_postcode`, so the geocoder and the
+    cube group by stored keys instead of parsing postcodes again.
+    """
+
+    name = 'postcodes'
+    columns = [*[f'postcode_{level}' for level in POSTCODE_LEVELS], 'postcode_completeness']
+    report_columns = ['company', 'postcode_completeness', 'count']
+
+    def __init__(self, report_path: str = POSTCODE_REPORT_PATH):
+        self.report_path = report_path
+
+    @property
+    def hash(self) -> str:
+        return hashlib.sha256(f"{POSTCODE_STAGE_VERSION}:{POSTCODE_PARTS_PATTERN}".encode()).hexdigest()
+
+    def apply(self, table: pa.Table) -> Tuple[pa.Table, pd.DataFrame]:
+        parsed = parse_postcodes(table.column('location_postcode').to_pandas())
+        for level in POSTCODE_LEVELS:
+            table = set_column(table, f'postcode_{level}', pa.array(parsed[level]))
+        table = set_column(table, 'postcode_completeness', pa.array(parsed['completeness']))
+
+        report = pd.DataFrame({'company': table.column('company').to_pandas().to_numpy(),
+                               'postcode_completeness': parsed['completeness'].to_numpy()})
+        report = report.groupby(['company', 'postcode_completeness'], observed=True, as_index=False).size()
+        return table, report.rename(columns={'size': 'count'})
+
+    def report(self, reports: List[pd.DataFrame]) -> None:
+        reports = [report for report in reports if not report.empty]
+        if not reports:
+            return
+        summary = pd.concat(reports).pivot_table(index='company', columns='postcode_completeness', values='count',
+                                                 aggfunc='sum', fill_value=0)
+        summary = summary.reindex(columns=[level for level in POSTCODE_COMPLETENESS if level in summary])
+        Path(self.report_path).parent.mkdir(parents=True, exist_ok=True)
+        summary.to_csv(self.report_path)
+
+        totals = summary.sum()
+        breakdown = ', '.join(f"{level}: {int(count)}" for level, count in totals.items())
+        logging.info(f"Parsed {int(totals.sum())} postcodes ({breakdown}); see {self.report_path}")
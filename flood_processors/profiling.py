@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import tracemalloc
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+RUN_REPORT_DIR = 'results/run_reports'
+
+
+def max_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far, in MiB (None where the platform cannot tell)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+def rows_per_second(rows: Optional[int], seconds: float) -> Optional[float]:
+    if not rows or not seconds:
+        return None
+    return round(rows / seconds, 1)
+
+
+class StageProfiler:
+    """
+    Wall time, rows and memory of the named stages of a run.
+
+    Each `stage` block appends one record to `stages`. The peak of Python
+    allocations within the stage is recorded while tracemalloc is tracing
+    (it is not started here, as it slows everything down); the process's
+    peak resident memory at the end of the stage is always recorded.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict] = []
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        """Time the enclosed block; set `record['rows']` inside it if the count is only known then."""
+        record = {'stage': name, 'rows': rows}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 3)
+            record['rows_per_second'] = rows_per_second(record['rows'], record['seconds'])
+            if tracing:
+                record['peak_python_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+            record['max_rss_mb'] = max_rss_mb()
+            self.stages.append(record)
+            logging.debug(f"Stage {name} took {record['seconds']}s")
+
+
+class ProcessorProfiler:
+    """
+    Wall time, rows and peak allocations of one processor run, per stage,
+    file and sheet.
+
+    Stages are 'read' (Excel parsing), 'transform' (the processor's own code
+    between chunks), 'parse_dates', 'build_records' and 'write'. Stages nest
+    (dates are parsed while transforming), and each reports only its own
+    time, so the stage times of a run add up. Repeated measurements of the
+    same stage, file and sheet (e.g. streamed chunks) are summed. Peak
+    allocations are the most memory allocated on top of what was held when
+    the stage started, measured with tracemalloc when
+    FLOOD_TRACE_MEMORY=1 (it slows processing down, so it is off by default).
+    """
+
+    def __init__(self, company_name: str, trace_memory: Optional[bool] = None):
+        self.company_name = company_name
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._totals: Dict[tuple, Dict] = {}
+        self._open: List[Dict] = []
+        if trace_memory is None:
+            trace_memory = os.environ.get('FLOOD_TRACE_MEMORY', '0') == '1'
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def location(self) -> tuple:
+        """File and sheet of the innermost stage being measured."""
+        return (self._open[-1]['file'], self._open[-1]['sheet']) if self._open else (None, None)
+
+    def _checkpoint(self) -> None:
+        """Fold the allocation peak since the last reset into every open stage."""
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._open:
+            if 'base' in frame:
+                frame['peak'] = max(frame['peak'], peak - frame['base'])
+
+    @contextmanager
+    def measure(self, stage: str, file=None, sheet=None, rows: Optional[int] = None):
+        """
+        Measure the enclosed block as `stage` of a file and sheet (those of the
+        enclosing stage if omitted). Set `frame['rows']` inside the block if the
+        row count is only known at the end.
+        """
+        parent = self._open[-1] if self._open else None
+        if file is None and parent is not None:
+            file, sheet = parent['file'], parent['sheet']
+        frame = {'stage': stage, 'file': None if file is None else Path(file).name,
+                 'sheet': None if sheet is None else str(sheet), 'rows': rows, 'children': 0.0, 'peak': 0}
+        if tracemalloc.is_tracing():
+            self._checkpoint()
+            tracemalloc.reset_peak()
+            frame['base'] = tracemalloc.get_traced_memory()[0]
+        self._open.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            elapsed = time.perf_counter() - start
+            if tracemalloc.is_tracing():
+                self._checkpoint()
+            # Frames opened by generators need not close in order
+            self._open.remove(frame)
+            if parent is not None:
+                parent['children'] += elapsed
+            self._add(frame, elapsed - frame['children'])
+
+    def _add(self, frame: Dict, seconds: float) -> None:
+        key = (frame['stage'], frame['file'], frame['sheet'])
+        total = self._totals.setdefault(key, {'stage': frame['stage'], 'file': frame['file'], 'sheet': frame['sheet'],
+                                              'calls': 0, 'rows': 0, 'seconds': 0.0, 'peak_alloc_mb': None})
+        total['calls'] += 1
+        total['rows'] += frame['rows'] or 0
+        total['seconds'] += seconds
+        if 'base' in frame:
+            total['peak_alloc_mb'] = max(total['peak_alloc_mb'] or 0.0, round(frame['peak'] / 2 ** 20, 1))
+
+    def report(self, records: int, **fields) -> Dict:
+        """The run so far as a JSON-serializable dict, with any extra `fields` appended."""
+        seconds = time.perf_counter() - self._start
+        stages = []
+        for total in self._totals.values():
+            stages.append(dict(total, seconds=round(total['seconds'], 3),
+                               rows_per_second=rows_per_second(total['rows'], total['seconds'])))
+        by_stage = {}
+        for total in self._totals.values():
+            summary = by_stage.setdefault(total['stage'], {'rows': 0, 'seconds': 0.0})
+            summary['rows'] += total['rows']
+            summary['seconds'] += total['seconds']
+        for summary in by_stage.values():
+            summary['rows_per_second'] = rows_per_second(summary['rows'], summary['seconds'])
+            summary['seconds'] = round(summary['seconds'], 3)
+        return {
+            'company': self.company_name,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': round(seconds, 3),
+            'records': records,
+            'rows_per_second': rows_per_second(records, seconds),
+            'unaccounted_seconds': round(seconds - sum(total['seconds'] for total in self._totals.values()), 3),
+            'trace_memory': tracemalloc.is_tracing(),
+            'max_rss_mb': max_rss_mb(),
+            'totals': by_stage,
+            'stages': stages,
+            **fields,
+        }
+
+    def save(self, records: int, report_dir: str = RUN_REPORT_DIR, **fields) -> str:
+        """Write the run report as JSON and stop tracemalloc if this profiler started it."""
+        path = save_run_report(self.company_name, self.report(records, **fields), self.started_at, report_dir)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return path
+
+
+def save_run_report(name: str, report: Dict, started_at: datetime, report_dir: str = RUN_REPORT_DIR) -> str:
+    """
+    Write a run report to <report_dir>/<name>/<UTC start time>.json, keeping
+    earlier runs so throughput can be followed over time.
+    """
+    slug = re.sub(r'\W+', '_', name.lower()).strip('_')
+    path = Path(report_dir) / slug / f"{started_at.strftime('%Y%m%dT%H%M%S%fZ')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return str(path)
@@ -0,0 +1,200 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from flood_processors.dataset import read_company
+
+PYRAMID_DIR = 'results/pyramid'
+PYRAMID_VERSION = 1
+MAX_ZOOM = 14
+
+# Area centroids (e.g. 'LS') are too coarse to place on a map; towns are about as precise as districts
+DEFAULT_PRECISIONS = ('unit', 'sector', 'district', 'place')
+
+UNCATEGORIZED = 'Uncategorized'
+
+
+def tile_coordinates(latitude, longitude, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator (slippy map) tile x/y containing each point at `zoom`."""
+    latitude = np.radians(np.clip(np.asarray(latitude, dtype=np.float64), -85.0511, 85.0511))
+    longitude = np.asarray(longitude, dtype=np.float64)
+    scale = 2 ** zoom
+    x = np.floor((longitude + 180.0) / 360.0 * scale)
+    y = np.floor((1.0 - np.log(np.tan(latitude) + 1.0 / np.cos(latitude)) / np.pi) / 2.0 * scale)
+    return np.clip(x, 0, scale - 1).astype(np.int64), np.clip(y, 0, scale - 1).astype(np.int64)
+
+
+def tile_bounds(x, y, zoom: int) -> Dict[str, np.ndarray]:
+    """South, west, north and east edges (degrees) of tiles at `zoom`."""
+    scale = 2 ** zoom
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    def latitude(tile_y):
+        return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * tile_y / scale))))
+
+    return {'south': latitude(y + 1), 'west': x / scale * 360.0 - 180.0,
+            'north': latitude(y), 'east': (x + 1) / scale * 360.0 - 180.0}
+
+
+def _positions(values, labels: List[str], missing: int = -1) -> np.ndarray:
+    """Position of each value in `labels` (`missing` for nulls), looked up once per category and broadcast by code."""
+    values = pd.Series(values, copy=False).astype('category')
+    lookup = np.append(pd.Index(labels).get_indexer(values.cat.categories.astype(str)), missing)
+    return lookup[values.cat.codes.to_numpy()]
+
+
+def _reduce_cells(keys: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum the count rows of duplicate cell keys; returns sorted unique keys and their counts."""
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+    if not len(starts):
+        return keys, counts[:0]
+    return keys[starts], np.add.reduceat(counts[order], starts, axis=0)
+
+
+class HeatmapPyramid:
+    """
+    Incident counts on a Web Mercator tile grid at every zoom level up to `max_zoom`.
+
+    Each level holds the occupied cells only: sorted `x` / `y` tile indices
+    and a `counts` array of shape (cells, companies, categories). The finest
+    level is binned from the incidents in one vectorized pass; every coarser
+    level is derived from the one below it by merging each 2x2 block of
+    cells, so raw records are never rescanned.
+    """
+
+    def __init__(self, companies: List[str], categories: List[str], levels: Dict[int, Dict[str, np.ndarray]]):
+        self.companies = list(companies)
+        self.categories = list(categories)
+        self.levels = levels
+
+    @property
+    def max_zoom(self) -> int:
+        return max(self.levels)
+
+    @classmethod
+    def build(cls, frames: Sequence[pd.DataFrame], max_zoom: int = MAX_ZOOM) -> 'HeatmapPyramid':
+        """
+        Build a pyramid from frames with latitude, longitude, company and
+        category columns (e.g. one per company).
+        """
+        frames = [frame.dropna(subset=['latitude', 'longitude']) for frame in frames]
+        companies = sorted({str(company) for frame in frames for company in frame['company'].dropna().unique()})
+        categories = sorted({str(category) for frame in frames for category in frame['category'].dropna().unique()})
+        categories.append(UNCATEGORIZED)
+
+        shape = (len(companies), len(categories))
+        scale = 2 ** max_zoom
+        keys, counts = [], []
+        for frame in frames:
+            if frame.empty:
+                continue
+            x, y = tile_coordinates(frame['latitude'], frame['longitude'], max_zoom)
+            company = _positions(frame['company'], companies)
+            category = _positions(frame['category'], categories, missing=len(categories) - 1)
+
+            # One bincount over (cell, company, category) per frame
+            cell_keys, cells = np.unique(x * scale + y, return_inverse=True)
+            flat = (cells.ravel() * shape[0] + company) * shape[1] + category
+            binned = np.bincount(flat, minlength=len(cell_keys) * shape[0] * shape[1])
+            keys.append(cell_keys)
+            counts.append(binned.reshape(len(cell_keys), *shape).astype(np.uint32))
+
+        if keys:
+            cell_keys, cell_counts = _reduce_cells(np.concatenate(keys), np.concatenate(counts))
+        else:
+            cell_keys, cell_counts = np.array([], dtype=np.int64), np.zeros((0, *shape), dtype=np.uint32)
+
+        levels = {}
+        x, y = cell_keys // scale, cell_keys % scale
+        for zoom in range(max_zoom, -1, -1):
+            levels[zoom] = {'x': x.astype(np.uint32), 'y': y.astype(np.uint32), 'counts': cell_counts}
+            if zoom:
+                x, y = x >> 1, y >> 1
+                parent_keys, cell_counts = _reduce_cells(x * 2 ** (zoom - 1) + y, cell_counts)
+                x, y = parent_keys // 2 ** (zoom - 1), parent_keys % 2 ** (zoom - 1)
+        return cls(companies, categories, levels)
+
+    @classmethod
+    def from_results(cls, outputs: Sequence[str], max_zoom: int = MAX_ZOOM,
+                     precisions: Sequence[str] = DEFAULT_PRECISIONS) -> 'HeatmapPyramid':
+        """Build a pyramid from geocoded company partitions, reading only the columns it needs."""
+        frames = []
+        for output in outputs:
+            table = read_company(output, columns=['latitude', 'longitude', 'geo_precision', 'company', 'category'])
+            frame = table.to_pandas()
+            frames.append(frame[frame['geo_precision'].isin(precisions)])
+        return cls.build(frames, max_zoom)
+
+    def save(self, path: str = PYRAMID_DIR) -> None:
+        """Write each level as .npy arrays plus a meta.json, replacing any previous pyramid atomically."""
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+        for zoom, level in self.levels.items():
+            for name, values in level.items():
+                np.save(tmp_path / f'z{zoom}_{name}.npy', values)
+        with open(tmp_path / 'meta.json', 'w') as f:
+            json.dump({'version': PYRAMID_VERSION, 'max_zoom': self.max_zoom,
+                       'companies': self.companies, 'categories': self.categories}, f, indent=2)
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = PYRAMID_DIR) -> 'HeatmapPyramid':
+        """Open a saved pyramid; arrays are memory-mapped and only read when a level is used."""
+        path = Path(path)
+        with open(path / 'meta.json') as f:
+            meta = json.load(f)
+        if meta.get('version') != PYRAMID_VERSION:
+            raise ValueError(f"Pyramid in {path} is outdated; re-run run_pipeline.py")
+        levels = {
+            zoom: {name: np.load(path / f'z{zoom}_{name}.npy', mmap_mode='r') for name in ('x', 'y', 'counts')}
+            for zoom in range(meta['max_zoom'] + 1)
+        }
+        return cls(meta['companies'], meta['categories'], levels)
+
+    @staticmethod
+    def _positions(labels: List[str], selection: List[str]) -> np.ndarray:
+        positions = pd.Index(labels).get_indexer(selection)
+        if (positions < 0).any():
+            unknown = [name for name, position in zip(selection, positions) if position < 0]
+            raise ValueError(f"Unknown values {unknown}; expected some of {labels}")
+        return positions
+
+    def cells(self, zoom: int, companies: Optional[List[str]] = None, categories: Optional[List[str]] = None,
+              bbox: Optional[Tuple[float, float, float, float]] = None) -> pd.DataFrame:
+        """
+        Occupied cells of one zoom level with their incident counts, optionally
+        restricted to some companies / categories and to a (south, west, north,
+        east) bounding box. Returns x, y, the cell bounds and `count`.
+        """
+        level = self.levels[zoom]
+        x, y = np.asarray(level['x']), np.asarray(level['y'])
+        selected = np.ones(len(x), dtype=bool)
+        if bbox is not None:
+            south, west, north, east = bbox
+            x_min, y_min = tile_coordinates(north, west, zoom)
+            x_max, y_max = tile_coordinates(south, east, zoom)
+            selected = (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+
+        counts = np.asarray(level['counts'][selected])
+        if companies is not None:
+            counts = counts[:, self._positions(self.companies, companies), :]
+        if categories is not None:
+            counts = counts[:, :, self._positions(self.categories, categories)]
+        counts = counts.sum(axis=(1, 2))
+
+        cells = pd.DataFrame({'x': x[selected], 'y': y[selected], 'count': counts.astype(np.int64)})
+        for name, values in tile_bounds(cells['x'], cells['y'], zoom).items():
+            cells[name] = values
+        return cells[cells['count'] > 0].reset_index(drop=True)
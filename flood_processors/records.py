@@ -0,0 +1,231 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from typing import Dict, List, Optional
+
+from flood_processors.schema import INCIDENT_FIELDS, LOCATION_FIELDS, ROW_GROUP_SIZE, conform, open_incident_writer
+
+
+def to_string_array(values, length: int) -> pa.Array:
+    """
+    Convert a column (or a scalar to broadcast) into an Arrow string array.
+    Missing values become nulls; anything else is rendered with str().
+    """
+    if values is None:
+        return pa.nulls(length, type=pa.string())
+    if isinstance(values, pa.Array):
+        return values if values.type == pa.string() else values.cast(pa.string())
+    if np.ndim(values) == 0:
+        if pd.isna(values):
+            return pa.nulls(length, type=pa.string())
+        return pa.array(np.full(length, str(values), dtype=object), type=pa.string())
+
+    series = pd.Series(values, copy=False)
+    if len(series) != length:
+        raise ValueError(f"Column has {len(series)} values, expected {length}")
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return to_dictionary_array(series, length).dictionary_decode()
+    if isinstance(series.dtype, pd.StringDtype):
+        # Arrow-backed strings convert without a Python object per value
+        return pa.array(series).cast(pa.string())
+    mask = series.isna().to_numpy()
+    if series.dtype != object or not pd.api.types.is_string_dtype(series):
+        series = series.astype(str)
+    return pa.array(series.to_numpy(dtype=object), mask=mask, type=pa.string())
+
+
+def to_dictionary_array(values, length: int) -> pa.DictionaryArray:
+    """
+    Like to_string_array, but dictionary encoded, for low-cardinality text such
+    as incident types: records are held as integer codes plus one copy of
+    each distinct string. Categoricals are converted from their codes, without
+    rendering a string per row.
+    """
+    if isinstance(values, pd.Categorical) or isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        series = pd.Series(values, copy=False)
+        if len(series) != length:
+            raise ValueError(f"Column has {len(series)} values, expected {length}")
+        codes = series.cat.codes.to_numpy(np.int32)
+        dictionary = to_string_array(pd.Series(series.cat.categories, dtype=object), len(series.cat.categories))
+        return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), dictionary)
+    return to_string_array(values, length).dictionary_encode()
+
+
+def to_date_array(values, length: int) -> pa.Array:
+    """
+    Convert a column of dates into an Arrow date32 array. Accepts datetime64
+    columns (as returned by standardize_dates) or YYYY-MM-DD strings.
+    """
+    if values is None:
+        return pa.nulls(length, type=pa.date32())
+    if np.ndim(values) == 0:
+        values = pd.Series([values] * length, dtype=object)
+
+    series = pd.Series(values, copy=False)
+    if len(series) != length:
+        raise ValueError(f"Column has {len(series)} values, expected {length}")
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if series.dt.tz is not None:
+            series = series.dt.tz_localize(None)
+        return pc.cast(pa.array(series), pa.date32(), safe=False)
+
+    text = to_string_array(series, length)
+    timestamps = pc.strptime(pc.utf8_slice_codeunits(text, 0, 10), format='%Y-%m-%d', unit='s', error_is_null=True)
+    return pc.cast(timestamps, pa.date32())
+
+
+class RecordBuilder:
+    """
+    Columnar accumulator for standardized incident records.
+
+    Processors append whole columns (`add_columns`); each append is converted
+    straight into typed Arrow arrays matching INCIDENT_SCHEMA, with incident
+    types, incident fields and date precisions dictionary encoded from the
+    start. `add_record` is kept for row-at-a-time callers and is buffered into
+    columns every `chunk_size` rows.
+
+    After `open_stream`, completed chunks are flushed to a Parquet file as row
+    groups of `row_group_size` rows instead of being kept in memory.
+    """
+
+    def __init__(self, company_name: str, chunk_size: int = 65536):
+        self.company_name = company_name
+        self.chunk_size = chunk_size
+        self._chunks: List[pa.Table] = []
+        self._num_rows = 0
+        self._pending_rows = 0
+        self._reset_row_buffer()
+        self._stream_path = None
+        self._writer = None
+        self._streamed_rows = 0
+        self.row_group_size = ROW_GROUP_SIZE
+
+    def __len__(self) -> int:
+        return self._streamed_rows + self._num_rows + self._pending_rows
+
+    @property
+    def streaming(self) -> bool:
+        return self._stream_path is not None
+
+    def open_stream(self, path: str, row_group_size: int = ROW_GROUP_SIZE) -> None:
+        """Start writing records to `path` as they arrive rather than holding them in memory."""
+        self._stream_path = path
+        self.row_group_size = row_group_size
+
+    def close_stream(self) -> int:
+        """Flush buffered records, close the stream and return the number of rows written."""
+        self._flush_rows()
+        if self._chunks:
+            self._write_row_group()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._stream_path = None
+        return self._streamed_rows
+
+    def _write_row_group(self) -> None:
+        table = self._assemble()
+        if self._writer is None:
+            self._writer = open_incident_writer(self._stream_path)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self._streamed_rows += table.num_rows
+        self._num_rows = 0
+        self._chunks = []
+
+    def _reset_row_buffer(self):
+        self._row_dates = []
+        self._row_types = []
+        self._row_locations = []
+        self._pending_rows = 0
+
+    def add_columns(self, incident_date, incident_type, location: Optional[Dict] = None,
+                    date_precision=None, release=None, fields: Optional[Dict] = None) -> None:
+        """
+        Append a batch of records given as columns. Any argument may be a scalar,
+        which is broadcast to the length of the array-like arguments.
+        `fields` maps incident fields (see INCIDENT_FIELDS) to columns.
+        """
+        self._flush_rows()
+        location = location or {}
+        unknown = set(location) - set(LOCATION_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown location fields {sorted(unknown)}; expected {LOCATION_FIELDS}")
+        fields = fields or {}
+        unknown = set(fields) - set(INCIDENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown incident fields {sorted(unknown)}; expected {INCIDENT_FIELDS}")
+
+        length = None
+        for values in [incident_date, incident_type, date_precision, *fields.values(), *location.values()]:
+            if values is not None and np.ndim(values) > 0:
+                length = len(values)
+                break
+        if not length:
+            return
+
+        columns = {
+            'incident_date': to_date_array(incident_date, length),
+            'date_precision': to_dictionary_array(date_precision, length),
+            'incident_type': to_dictionary_array(incident_type, length),
+            'release': to_dictionary_array(release, length),
+        }
+        for field in INCIDENT_FIELDS:
+            columns[field] = to_dictionary_array(fields.get(field), length)
+        for field in LOCATION_FIELDS:
+            columns[f'location_{field}'] = to_string_array(location.get(field), length)
+
+        self._chunks.append(pa.table(columns))
+        self._num_rows += length
+        if self.streaming and self._num_rows >= self.row_group_size:
+            self._write_row_group()
+
+    def add_record(self, incident_date: str, incident_type: str, location: Dict) -> None:
+        """Append a single record (compatibility path for row-at-a-time processors)."""
+        self._row_dates.append(incident_date)
+        self._row_types.append(incident_type)
+        self._row_locations.append(location or {})
+        self._pending_rows += 1
+        if self._pending_rows >= self.chunk_size:
+            self._flush_rows()
+
+    def _flush_rows(self) -> None:
+        if not self._pending_rows:
+            return
+        dates, types, locations = self._row_dates, self._row_types, self._row_locations
+        self._reset_row_buffer()
+
+        # Older processors describe a location as {'type': <field>, 'value': <value>}
+        locations = [
+            {loc['type']: loc.get('value')} if 'type' in loc and loc['type'] in LOCATION_FIELDS else loc
+            for loc in locations
+        ]
+        location_columns = {
+            field: pd.Series([loc.get(field) for loc in locations], dtype=object)
+            for field in LOCATION_FIELDS
+        }
+        self.add_columns(
+            incident_date=pd.Series(dates, dtype=object),
+            incident_type=pd.Series(types, dtype=object),
+            location=location_columns
+        )
+
+    def to_table(self) -> pa.Table:
+        """Assemble all appended chunks into a single Arrow table with INCIDENT_SCHEMA."""
+        if self.streaming:
+            raise RuntimeError("Records are being streamed to disk; use close_stream() instead")
+        self._flush_rows()
+        return self._assemble()
+
+    def _assemble(self) -> pa.Table:
+        if self._chunks:
+            data = pa.concat_tables(self._chunks).combine_chunks()
+        else:
+            data = pa.table({'incident_date': pa.array([], pa.date32())})
+
+        # A single-entry dictionary: the company name is stored once, not per row
+        company = pa.DictionaryArray.from_arrays(
+            pa.array(np.zeros(data.num_rows, dtype=np.int32)),
+            pa.array([self.company_name])
+        )
+        return conform(data.append_column('company', company))
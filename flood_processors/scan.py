@@ -0,0 +1,42 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from flood_processors.categoricals import concat_categorical
+
+
+def _count_fragment(fragment: ds.Fragment, schema: pa.Schema, group_by: List[str], filter) -> pd.DataFrame:
+    """Count the records of one file per group, reading only the grouped columns."""
+    table = fragment.to_table(schema=schema, columns=group_by, filter=filter)
+    if not table.num_rows:
+        return pd.DataFrame(columns=[*group_by, 'count'])
+    counts = table.group_by(group_by).aggregate([([], 'count_all')])
+    return counts.rename_columns([*group_by, 'count']).to_pandas()
+
+
+def scan_counts(dataset: ds.Dataset, group_by: List[str], filter: Optional[ds.Expression] = None,
+                workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Count records of a dataset per combination of the `group_by` columns.
+
+    Files are scanned in parallel threads (Arrow releases the GIL while
+    decoding), each reading only the grouped columns and aggregating its own
+    partial counts, which are then merged. Memory is bounded by the number of
+    groups, not records; files whose partitions cannot match `filter` are
+    never opened.
+    """
+    fragments = list(dataset.get_fragments(filter=filter))
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(lambda fragment: _count_fragment(fragment, dataset.schema, group_by, filter),
+                                 fragments))
+
+    partials = [partial for partial in partials if not partial.empty]
+    if not partials:
+        return pd.DataFrame(columns=[*group_by, 'count'])
+    # Partial counts share categories only per file; recode them onto one set so the merge groups by codes
+    merged = concat_categorical(partials, group_by)
+    return merged.groupby(group_by, as_index=False, observed=True, dropna=False)['count'].sum()
@@ -0,0 +1,74 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Location fields every record carries, stored as flat location_<field> columns
+LOCATION_FIELDS = ['postcode', 'town', 'district', 'county']
+
+# Parts of an incident type that sources give in separate columns, stored as dictionary-encoded columns of their own
+INCIDENT_FIELDS = ['cause', 'flooding_location', 'flooding_type', 'sub_type']
+
+# Fixed schema of the standardized records in results/. Low-cardinality text is dictionary encoded,
+# which Parquet keeps as dictionary pages and pandas reads back as categoricals.
+INCIDENT_SCHEMA = pa.schema([
+    ('company', pa.dictionary(pa.int32(), pa.string())),
+    ('incident_date', pa.date32()),
+    ('date_precision', pa.dictionary(pa.int8(), pa.string())),
+    ('incident_type', pa.dictionary(pa.int32(), pa.string())),
+    *[(field, pa.dictionary(pa.int32(), pa.string())) for field in INCIDENT_FIELDS],
+    # The EIR release (workbook and sheet) a record was read from, e.g. 'EIR 996.xlsx [EIR 966 Final]'
+    ('release', pa.dictionary(pa.int16(), pa.string())),
+    *[(f'location_{field}', pa.string()) for field in LOCATION_FIELDS],
+    # The remaining columns are filled in by the results stages after a processor has run
+    ('latitude', pa.float32()),
+    ('longitude', pa.float32()),
+    ('geo_precision', pa.dictionary(pa.int8(), pa.string())),
+    # The valid postcode a malformed location_postcode was geocoded at, if any
+    ('postcode_corrected', pa.string()),
+    # Canonical gazetteer name of the record's town or district
+    ('place', pa.dictionary(pa.int32(), pa.string())),
+    ('category', pa.dictionary(pa.int8(), pa.string())),
+    # Similarity to the nearest labelled incident type, for categories proposed by the classifier (else null)
+    ('category_confidence', pa.float32()),
+    # location_postcode normalized and split into keys, e.g. SW1A 1AA / SW1A 1 / SW1A / SW
+    ('postcode_unit', pa.string()),
+    ('postcode_sector', pa.dictionary(pa.int32(), pa.string())),
+    ('postcode_district', pa.dictionary(pa.int16(), pa.string())),
+    ('postcode_area', pa.dictionary(pa.int16(), pa.string())),
+    ('postcode_completeness', pa.dictionary(pa.int8(), pa.string())),
+])
+
+ROW_GROUP_SIZE = 131072
+
+PARQUET_WRITE_OPTIONS = {
+    'compression': 'zstd',
+    'compression_level': 3,
+    # Postcodes are close to unique per row, so dictionary pages would only add overhead
+    'use_dictionary': ['company', 'date_precision', 'incident_type', *INCIDENT_FIELDS, 'release',
+                       'location_town', 'location_district', 'location_county', 'geo_precision', 'place', 'category',
+                       'postcode_sector', 'postcode_district', 'postcode_area', 'postcode_completeness'],
+    'write_statistics': True,
+}
+
+
+def conform(table: pa.Table) -> pa.Table:
+    """Cast a table of standardized records to INCIDENT_SCHEMA, adding missing columns as nulls."""
+    columns = []
+    for field in INCIDENT_SCHEMA:
+        if field.name in table.column_names:
+            column = table.column(field.name)
+            if column.type != field.type:
+                column = column.cast(field.type)
+        else:
+            column = pa.nulls(table.num_rows, type=field.type)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, schema=INCIDENT_SCHEMA)
+
+
+def write_incidents(table: pa.Table, path: str, row_group_size: int = ROW_GROUP_SIZE) -> None:
+    """Write standardized records to Parquet with the tuned compression and row group settings."""
+    pq.write_table(conform(table), path, row_group_size=row_group_size, **PARQUET_WRITE_OPTIONS)
+
+
+def open_incident_writer(path: str) -> pq.ParquetWriter:
+    """ParquetWriter for streaming standardized records into `path` row group by row group."""
+    return pq.ParquetWriter(path, INCIDENT_SCHEMA, **PARQUET_WRITE_OPTIONS)
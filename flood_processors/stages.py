@@ -0,0 +1,131 @@
+import os
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from flood_processors.categoricals import concat_categorical
+from flood_processors.manifest import BuildManifest
+from flood_processors.dataset import (company_from_path, open_partition_writer, partition_files,
+                                      to_partition_file, with_company)
+from flood_processors.schema import ROW_GROUP_SIZE
+
+
+class ResultStage:
+    """
+    A post-processing step that fills in columns of every results partition.
+
+    `hash` identifies the reference data the stage uses; a company's results
+    are re-processed whenever it changes. `apply` receives one row group as an
+    Arrow table and returns it with the stage's `columns` replaced, together
+    with a DataFrame of `report_columns` whose last column is a count (e.g.
+    unmapped values). `report` is given the reports of all companies at
+    once, so problems are summarized in bulk rather than per row.
+    """
+
+    name: str = None
+    columns: List[str] = []
+    report_columns: List[str] = []
+
+    @property
+    def hash(self) -> str:
+        raise NotImplementedError
+
+    def apply(self, table: pa.Table) -> Tuple[pa.Table, pd.DataFrame]:
+        raise NotImplementedError
+
+    def report(self, reports: List[pd.DataFrame]) -> None:
+        pass
+
+
+def set_column(table: pa.Table, name: str, values) -> pa.Table:
+    """Replace (or add) a column of a table."""
+    if name in table.column_names:
+        table = table.drop_columns([name])
+    return table.append_column(name, values if isinstance(values, (pa.Array, pa.ChunkedArray)) else pa.array(values))
+
+
+def empty_report(stage: ResultStage) -> pd.DataFrame:
+    return pd.DataFrame(columns=stage.report_columns)
+
+
+def merge_reports(stage: ResultStage, reports: List[pd.DataFrame]) -> pd.DataFrame:
+    """Combine reports, summing the count column over identical keys."""
+    reports = [report for report in reports if not report.empty]
+    if not reports:
+        return empty_report(stage)
+    *keys, count = stage.report_columns
+    return concat_categorical(reports, keys).groupby(keys, as_index=False, observed=True, dropna=False)[count].sum()
+
+
+def rewrite_results(path, stages: List[ResultStage], batch_rows: int = ROW_GROUP_SIZE) -> Dict[str, pd.DataFrame]:
+    """
+    Apply stages to every file of one company partition in a single pass, a
+    row group at a time, replacing each file atomically. Returns each stage's
+    report.
+    """
+    company = company_from_path(path)
+    reports = {stage.name: [] for stage in stages}
+    for file in partition_files(path):
+        tmp_path = file.with_name(f".{file.name}.tmp-{os.getpid()}")
+        writer = None
+        try:
+            parquet_file = pq.ParquetFile(file)
+            writer = open_partition_writer(tmp_path)
+            for batch in parquet_file.iter_batches(batch_size=batch_rows):
+                table = with_company(pa.Table.from_batches([batch]), company)
+                for stage in stages:
+                    table, report = stage.apply(table)
+                    reports[stage.name].append(report)
+                writer.write_table(to_partition_file(table), row_group_size=batch_rows)
+            writer.close()
+            writer = None
+            os.replace(tmp_path, file)
+        finally:
+            if writer is not None:
+                writer.close()
+            if tmp_path.exists():
+                tmp_path.unlink()
+    return {stage.name: merge_reports(stage, reports[stage.name]) for stage in stages}
+
+
+def run_result_stages(results: List[Dict], manifest: BuildManifest, stages: List[ResultStage]) -> None:
+    """
+    Bring the stage columns of every company's results up to date.
+
+    A company's files are rewritten when its processor has just run, or when
+    a stage's reference data changed since they were last processed; only the
+    stale stages are applied. Reports are kept in the manifest per company so each
+    stage can report on all results, not only the ones rewritten this run.
+    """
+    states = {stage.name: manifest.stage(stage.name).setdefault('outputs', {}) for stage in stages}
+    for result in results:
+        output = result['output']
+        if result['status'] == 'failed' or not output:
+            continue
+        stale = [stage for stage in stages
+                 if result['status'] == 'ok' or states[stage.name].get(output, {}).get('hash') != stage.hash]
+        if not stale:
+            continue
+        try:
+            reports = rewrite_results(output, stale)
+        except Exception as e:
+            for stage in stale:
+                states[stage.name].pop(output, None)
+            result['status'] = 'failed'
+            result['error'] = f"{', '.join(stage.name for stage in stale)} stage failed: {type(e).__name__}: {e}"
+            logging.error(f"{result['source']}: {result['error']}")
+            continue
+        for stage in stale:
+            states[stage.name][output] = {'hash': stage.hash,
+                                          'report': reports[stage.name].astype(object).values.tolist()}
+
+    # Only report on results that are still current (not on removed or superseded outputs)
+    current = {entry['output'] for entry in manifest.entries.values()} | {result['output'] for result in results}
+    for stage in stages:
+        state = states[stage.name]
+        for output in [output for output in state if output not in current or not Path(output).exists()]:
+            del state[output]
+        stage.report([pd.DataFrame(entry['report'], columns=stage.report_columns) for entry in state.values()])
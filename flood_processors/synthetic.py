@@ -0,0 +1,369 @@
+import shutil
+import zlib
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from flood_processors.dates import EXCEL_EPOCH
+from flood_processors.xlsb import write_xlsb
+
+# The real company folders; each generated folder gets a copy of its process.py
+REPO_SOURCE_DIR = Path(__file__).parent.parent / 'source'
+
+DEFAULT_ROWS = 10_000
+
+# Share of blank cells in columns that are sometimes left empty in the real files
+MISSING_RATE = 0.02
+
+UNIT_LETTERS = list('ABDEFGHJLNPQRSTUWXYZ')
+
+# Postcode areas and towns of each company's region
+REGIONS = {
+    'Anglian Water': (['NR', 'IP', 'CB', 'PE', 'LN', 'CO'],
+                      ['Norwich', 'Ipswich', 'Cambridge', 'Peterborough', 'Lincoln', 'Colchester']),
+    'Northumbrian Water': (['NE', 'SR', 'DH', 'TS'], ['Newcastle upon Tyne', 'Sunderland', 'Durham', 'Middlesbrough']),
+    'Penon Water': (['EX', 'PL', 'TQ', 'TR'], ['Exeter', 'Plymouth', 'Torquay', 'Truro']),
+    'Severn Trent': (['B', 'CV', 'DE', 'NG', 'LE', 'ST', 'WV'],
+                     ['Birmingham', 'Coventry', 'Derby', 'Nottingham', 'Leicester', 'Stoke-on-Trent', 'Wolverhampton']),
+    'Southern Water': (['BN', 'SO', 'PO', 'CT', 'ME', 'TN', 'EX'],
+                       ['Brighton', 'Southampton', 'Portsmouth', 'Canterbury', 'Maidstone', 'Tunbridge Wells']),
+    'United utilities': (['M', 'L', 'WA', 'PR', 'BL', 'CA'], ['Manchester', 'Liverpool', 'Warrington', 'Preston', 'Bolton', 'Carlisle']),
+    'Wessex Water Services Ltd': (['BA', 'BS', 'DT', 'SP', 'TA'], ['Bath', 'Bristol', 'Dorchester', 'Salisbury', 'Taunton']),
+    'Yorkshire Water': (['LS', 'BD', 'HG', 'S', 'HU', 'YO', 'WF'], ['Leeds', 'Bradford', 'Harrogate', 'Sheffield', 'Hull', 'York', 'Wakefield']),
+}
+COUNTIES = ['East Sussex', 'West Sussex', 'Hampshire', 'Kent', 'Isle of Wight']
+
+CAUSES = ['Blockage', 'Blockage - Fat', 'Blockage - Rag', 'Collapse', 'Hydraulic overload', 'Equipment failure',
+          'Root ingress', 'Third party damage', 'Silt', 'Other']
+FLOODING_TYPES = ['Internal', 'External', 'Public Sewer Flooding', 'Public Area', 'Field']
+
+# Legend sheets as they appear in the workbooks: a title row then 'CODE - Description' rows
+ANGLIAN_LEGEND = ['Cause codes', 'BL - Blockage', 'CO - Collapse', 'HY - Hydraulic incapacity',
+                  'EQ - Equipment failure', 'TP - Third party', 'RT - Root ingress']
+SOUTHWEST_LEGEND = ['Cause codes', 'BLK - Blockage', 'COL - Collapse', 'HYD - Hydraulic overload',
+                    'PSF - Pumping station failure', 'OTH - Other']
+PENON_CAUSE_CODES = ['BLPR', 'BLFT', 'BLST', 'BLDB', 'BLRT', 'CLBU', 'PACB', 'PTCB', 'EQFL', 'HYOL', 'HOPS',
+                     'SEWC', 'TPDM', 'PSBL', 'PSBR']
+NORTHUMBRIAN_NOTES = ['* Data extracted from the incident management system', '* Excludes incidents under review']
+
+# A column generator returns n cell values for a company's region
+Column = Callable[[np.random.Generator, int, str], np.ndarray]
+
+
+def _blank(values: np.ndarray, rng: np.random.Generator, rate: float) -> np.ndarray:
+    values = np.asarray(values, dtype=object)
+    if rate:
+        values[rng.random(len(values)) < rate] = None
+    return values
+
+
+def dates(style: str, start: str = '2010-01-01', end: str = '2023-12-31', missing: float = 0.005,
+          notes: Optional[List[str]] = None) -> Column:
+    """
+    Incident dates between `start` and `end` encoded as real spreadsheets do:
+    'datetime' (date cells), 'dmy' or 'iso' text, 'yyyymmdd' integers or
+    'serial' Excel day numbers. `notes` replace the last values, like the
+    footnotes at the bottom of some sheets.
+    """
+    def generate(rng, n, region):
+        first, last = pd.Timestamp(start), pd.Timestamp(end)
+        days = pd.to_timedelta(rng.integers(0, (last - first).days + 1, n), unit='D')
+        values = pd.DatetimeIndex(first + days)
+        if style == 'datetime':
+            values = values.to_pydatetime()
+        elif style == 'dmy':
+            values = values.strftime('%d/%m/%Y')
+        elif style == 'iso':
+            values = values.strftime('%Y-%m-%d')
+        elif style == 'yyyymmdd':
+            values = (values.year * 10000 + values.month * 100 + values.day).to_numpy()
+        elif style == 'serial':
+            values = (values - EXCEL_EPOCH).days.to_numpy().astype('float64')
+        else:
+            raise ValueError(f"Unknown date style: {style}")
+        values = _blank(values, rng, missing)
+        if notes:
+            values[-len(notes):] = notes[:n]
+        return values
+    return generate
+
+
+def choice(options: List, missing: float = 0.0) -> Column:
+    """Values drawn from `options`, skewed so a few dominate as incident causes do."""
+    weights = 1 / np.arange(1, len(options) + 1)
+    weights = weights / weights.sum()
+
+    def generate(rng, n, region):
+        values = np.empty(n, dtype=object)
+        values[:] = [options[i] for i in rng.choice(len(options), n, p=weights)]
+        return _blank(values, rng, missing)
+    return generate
+
+
+def towns(missing: float = MISSING_RATE) -> Column:
+    return lambda rng, n, region: choice(REGIONS[region][1], missing)(rng, n, region)
+
+
+def postcodes(level: str = 'unit', missing: float = MISSING_RATE) -> Column:
+    """
+    Postcodes from the company's region at `level` ('unit', 'sector' or
+    'district'); full postcodes come with the usual mix of lower case,
+    missing and doubled spaces.
+    """
+    def generate(rng, n, region):
+        areas = np.array(REGIONS[region][0], dtype=object)
+        # Postcodes repeat (several incidents per street), so draw from a pool smaller than n
+        pool = max(1, min(n // 3, 50_000))
+        district = areas[rng.integers(0, len(areas), pool)] + rng.integers(1, 30, pool).astype(str)
+        sector = district + ' ' + rng.integers(0, 10, pool).astype(str)
+        letters = np.array(UNIT_LETTERS, dtype=object)
+        unit = sector + letters[rng.integers(0, len(letters), pool)] + letters[rng.integers(0, len(letters), pool)]
+        values = {'unit': unit, 'sector': sector, 'district': district}[level][rng.integers(0, pool, n)]
+        if level == 'unit':
+            variant = rng.random(n)
+            values = np.where(variant < 0.05, np.char.lower(values.astype(str)).astype(object), values)
+            values = np.where((variant >= 0.05) & (variant < 0.08),
+                              np.char.replace(values.astype(str), ' ', '').astype(object), values)
+            values = np.where((variant >= 0.08) & (variant < 0.1),
+                              np.char.replace(values.astype(str), ' ', '  ').astype(object), values)
+        return _blank(values, rng, missing)
+    return generate
+
+
+def constant(value) -> Column:
+    def generate(rng, n, region):
+        values = np.empty(n, dtype=object)
+        values[:] = value
+        return values
+    return generate
+
+
+def codes(legend: List[str], unknown: str = 'ZZ') -> Column:
+    """Codes of a legend sheet, with the occasional code the legend does not explain."""
+    return choice([entry.split(' - ')[0] for entry in legend if ' - ' in entry] + [unknown], missing=0.005)
+
+
+def _years(first: int, last: int) -> List[str]:
+    return [str(year) for year in range(first, last + 1)]
+
+
+def _severn_793(year: str) -> Dict[str, Column]:
+    return {'Incident Date': dates('datetime', f'{year}-01-01', f'{year}-12-31'),
+            'Internal, External, Public Sewer Flooding, Public Area, Field': choice(FLOODING_TYPES),
+            'Post Code': postcodes(),
+            'Incident Cause': choice(CAUSES, MISSING_RATE)}
+
+
+def _severn_674(year: str) -> Dict[str, Column]:
+    return {'Incident Date': dates('datetime', f'{year}-01-01', f'{year}-12-31'),
+            'Internal/ External/ Public Sewer Flooding/Public Area/Field': choice(FLOODING_TYPES),
+            'Location': towns(),
+            'Incident Cause': choice(CAUSES, MISSING_RATE),
+            ' ': choice(['See note'], missing=0.97),
+            None: choice(['Duplicate'], missing=0.97)}
+
+
+def _united_utilities_fy(sheet: str) -> Dict[str, Column]:
+    year = 2000 + int(sheet[2:])
+    return {'Date': dates('datetime', f'{year - 1}-04-01', f'{year}-03-31'),
+            'Incident Type': choice(['Internal Flooding', 'External Flooding']),
+            'Cause': choice(CAUSES, MISSING_RATE),
+            'Part Postcode': postcodes('district')}
+
+
+def _wessex() -> Dict[str, Column]:
+    return {'Date Reported': dates('datetime'),
+            'Job Type': choice(['Internal Flooding', 'External Flooding', 'Restricted Toilet Use']),
+            'High Level Fault': choice(['Blockage', 'Hydraulic Overload', 'Collapse', 'Equipment Failure'], MISSING_RATE),
+            'Postcode': postcodes()}
+
+
+def _eir24187(with_category: bool) -> Dict[str, Column]:
+    columns = {'Date Raised': dates('dmy'), 'Town/City': towns(), 'Postcode': postcodes()}
+    if with_category:
+        columns['Flooding Category'] = choice(['Internal', 'External'])
+        columns['Feedback Responsibility'] = choice(['Company', 'Third Party', 'Customer'])
+    columns['Feedback Cause'] = choice(CAUSES, MISSING_RATE)
+    return columns
+
+
+def _southern_2023() -> Dict[str, Column]:
+    return {'Incident_Date': dates('yyyymmdd', '2023-01-01', '2023-12-31'),
+            'Cause': choice(CAUSES, MISSING_RATE),
+            'Post Code Short': postcodes('sector'),
+            'posttown': towns(),
+            'county': choice(COUNTIES)}
+
+
+# Every workbook a processor reads: path within the company folder, data sheets
+# and their columns (in order, with the exact headers), and the legend sheet if any
+WORKBOOKS = {
+    'Anglian Water': [
+        {'path': 'Flooding data 2010 to 2020.xlsx',
+         'sheets': {'Data Request': {'Incident date': dates('datetime', end='2020-12-31'),
+                                     'Cause code': codes(ANGLIAN_LEGEND),
+                                     'Flooding type': choice([1, 2, 3]),
+                                     'Flooding sub type': choice([1, 2, 3, 4]),
+                                     'City': towns()}},
+         'legend': ANGLIAN_LEGEND},
+        {'path': '2nd request data (1).xlsx',
+         'sheets': {'Data': {'Incident date': dates('datetime', '2021-01-01'),
+                             'Cause code': codes(ANGLIAN_LEGEND),
+                             'Flooding type': choice([1, 2, 3]),
+                             'Flooding sub type': choice([1, 2, 3, 4]),
+                             'City': towns()}},
+         'legend': ANGLIAN_LEGEND},
+        {'path': '2023 data.xlsx',
+         'sheets': {'Sheet1': {'Incident date': dates('datetime', '2023-01-01'),
+                               'First Half Post Code': postcodes('district')}}},
+    ],
+    'Northumbrian Water': [
+        {'path': 'EIR22807 Sewer flooding incident data 2010 to 2023.xlsx',
+         'sheets': {'Sheet1': {'DATE': dates('datetime', notes=NORTHUMBRIAN_NOTES),
+                               'LOCATION': choice(['Internal', 'External']),
+                               'Cause': choice(CAUSES, MISSING_RATE),
+                               'Postcode': postcodes()}}},
+    ],
+    'Penon Water': [
+        {'path': 'EIR25077.xlsx',
+         'sheets': {sheet: {'Post Code ': postcodes(),
+                            'Raised Date': dates('datetime'),
+                            'Flooding Cause': choice(PENON_CAUSE_CODES, 0.005),
+                            'Location of Flooding': choice(['Garden', 'Highway', 'Property', 'Cellar']),
+                            None: choice(['Duplicate'], missing=0.97)}
+                    for sheet in ['External Sewer Floodings2010-23', 'Internal Sewer Floodings2010-23']}},
+        {'path': 'EIR24187.xlsx', 'sheets': {'Data': _eir24187(with_category=True)}},
+    ],
+    'Severn Trent': [
+        {'path': 'EIR 793 datafile.xlsx', 'sheets': {year: _severn_793(year) for year in _years(2010, 2020)}},
+        {'path': 'EIR674 Flooding Data 2021 2023.xlsx', 'sheets': {year: _severn_674(year) for year in _years(2021, 2023)}},
+        {'path': 'EIR641 2023 Flooding report data.xlsx',
+         'sheets': {'Sheet1': {'Type': choice(FLOODING_TYPES), 'Post Code': postcodes()}}},
+    ],
+    'Southern Water': [
+        {'path': '2023 Sewer Incidents.xlsx',
+         'sheets': {'Sewer Incidents 2023': _southern_2023(), 'suspicious (louis)': _southern_2023()}},
+        {'path': 'Southwest Water/EIR24187.xlsx', 'sheets': {'Data': _eir24187(with_category=False)}},
+        {'path': 'Southwest Water/2nd request/1405 Flooding data.xlsx',
+         'sheets': {'Data': {'Incident date': dates('dmy'),
+                             'Cause code': codes(SOUTHWEST_LEGEND, unknown='XXX'),
+                             'Flooding type': choice([1, 2, 3]),
+                             'Flooding sub type': choice(['A', 'B', 'C']),
+                             'City': towns(),
+                             'District': choice(['Devon', 'Cornwall', 'Somerset'])}},
+         'legend': SOUTHWEST_LEGEND},
+    ],
+    'United utilities': [
+        {'path': 'EIR 2023 Flooding.xlsx',
+         'sheets': {'Flooding_2023': {'INCIDENT DATE': dates('datetime', '2023-01-01'),
+                                      'CATEGORY': choice(['Internal', 'External']),
+                                      'INCIDENT  CAUSE': choice(CAUSES, MISSING_RATE),
+                                      'POSTCODE': postcodes()}}},
+        {'path': 'EIR-380 - Flooding Incidents Data.xlsb',
+         'sheets': {sheet: {'Incident Date': dates('serial', end='2020-12-31'),
+                            'Flooding Type': constant(sheet),
+                            'Flooding Location': choice(['Property', 'Garden', 'Highway', 'Cellar']),
+                            'Flooding Cause': choice(CAUSES, MISSING_RATE),
+                            'Impacted Customer Postcode': postcodes()}
+                    for sheet in ['Internal', 'External']}},
+        {'path': '2nd request/EIR 260 Flooding Incidents Data.xlsx',
+         'sheets': {sheet: _united_utilities_fy(sheet) for sheet in ['FY21', 'FY22', 'FY23']}},
+    ],
+    'Wessex Water Services Ltd': [
+        {'path': 'Flooding incidents EIR2025-046.xlsx', 'sheets': {'Sewer Water Incident Data': _wessex()}},
+        {'path': 'Sewer Flooding Incident Data 2023 EIR2024 079.xlsx',
+         'sheets': {'Sewer flooding incident data 23': _wessex()}},
+        {'path': '21-23 data/2021 2023 Flooding incidents EIR2024 131.xlsx',
+         'sheets': {'Sewer Water Incident Data': _wessex()}},
+    ],
+    'Yorkshire Water': [
+        {'path': 'EIR 937.xlsx',
+         'sheets': {'Sheet1': {'Inc date': dates('iso'),
+                               'Flooding source': choice(['Sewer', 'Rising main', 'Pumping station']),
+                               'Int/Ext': choice(['Int', 'Ext']),
+                               'Curtilage/Non-Curtilage': choice(['Curtilage', 'Non-Curtilage']),
+                               'Postcode Prefix': postcodes('district'),
+                               'Town': towns()}}},
+        {'path': 'EIR 996.xlsx',
+         'sheets': {'EIR 966 Final': {'Inc Date': dates('datetime', '2021-01-01'),
+                                      'Flooding Source': choice(['Sewer', 'Rising main', 'Pumping station']),
+                                      'Int/Ext/RTU': choice(['Int', 'Ext', 'RTU']),
+                                      'Curtilage/Non Curtilage': choice(['Curtilage', 'Non Curtilage']),
+                                      'Postcode Prefix': postcodes('district'),
+                                      'Town': towns()}}},
+    ],
+}
+
+
+def build_sheet(columns: Dict[Optional[str], Column], rows: int, rng: np.random.Generator, region: str) -> pd.DataFrame:
+    """Generate a sheet's rows; a None header is written as an empty header cell."""
+    df = pd.DataFrame({i: column(rng, rows, region) for i, column in enumerate(columns.values())})
+    df.columns = list(columns)
+    return df
+
+
+def write_workbook(path: Path, sheets: Dict[str, pd.DataFrame]) -> None:
+    """Write sheets as .xlsx (streamed row by row) or .xlsb, depending on the file name."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == '.xlsb':
+        write_xlsb(path, sheets)
+        return
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    for name, df in sheets.items():
+        sheet = workbook.create_sheet(name)
+        sheet.append(list(df.columns))
+        for row in df.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+
+
+def generate_company(company: str, company_dir: Path, rows: int = DEFAULT_ROWS, seed: int = 0) -> List[Path]:
+    """Write the synthetic workbooks of one company folder, `rows` rows per data sheet."""
+    # Seeded per company so a company's files do not depend on which others are generated
+    rng = np.random.default_rng([seed, zlib.crc32(company.encode())])
+    written = []
+    for spec in WORKBOOKS.get(company, []):
+        sheets = {name: build_sheet(columns, rows, rng, company) for name, columns in spec['sheets'].items()}
+        if spec.get('legend'):
+            sheets['Legend'] = pd.DataFrame({None: spec['legend']})
+        path = company_dir / spec['path']
+        write_workbook(path, sheets)
+        written.append(path)
+    return written
+
+
+def generate_source_tree(source_dir, rows: int = DEFAULT_ROWS, seed: int = 0,
+                         companies: Optional[List[str]] = None, workers: int = 1) -> Dict[str, List[Path]]:
+    """
+    Create a source folder laid out like the real one, with each company's
+    process.py and synthetic workbooks in place of the EIR responses, so the
+    processors and the pipeline can run on it unchanged. Companies are
+    written in parallel with `workers` > 1 (writing .xlsx is CPU bound).
+    """
+    source_dir = Path(source_dir)
+    jobs = []
+    for process_file in sorted(REPO_SOURCE_DIR.glob('*/process.py')):
+        company = process_file.parent.name
+        if companies and company not in companies:
+            continue
+        company_dir = source_dir / company
+        company_dir.mkdir(parents=True, exist_ok=True)
+        if (company_dir / 'process.py').resolve() != process_file.resolve():
+            shutil.copy2(process_file, company_dir / 'process.py')
+        jobs.append((company, company_dir, rows, seed))
+
+    if workers > 1 and jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = list(pool.map(generate_company, *zip(*jobs)))
+    else:
+        paths = [generate_company(*job) for job in jobs]
+
+    written = {}
+    for (company, company_dir, _, _), company_paths in zip(jobs, paths):
+        written[company] = company_paths
+        logging.info(f"Generated {len(company_paths)} workbooks for {company} in {company_dir}")
+    return written
@@ -0,0 +1,73 @@
+import logging
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from flood_processors.excel_cache import ExcelCache, get_excel_cache
+from flood_processors.excel_stream import StreamingWorkbook, iter_sheet_chunks, DEFAULT_CHUNK_ROWS
+
+
+class WorkbookSession:
+    """
+    A workbook that is opened at most once per processing run.
+
+    Sheets are served from the Excel cache when possible; on a miss the file
+    is unzipped and its shared XML parsed once, and every further sheet is
+    parsed from that same handle. Legend code maps are memoized per sheet.
+    """
+
+    def __init__(self, file_path, engine: Optional[str] = None, cache: Optional[ExcelCache] = None):
+        self.file_path = Path(file_path)
+        self.engine = engine
+        self.cache = cache or get_excel_cache()
+        self._excel_file: Optional[pd.ExcelFile] = None
+        self._streaming_workbook: Optional[StreamingWorkbook] = None
+        self._legends: Dict[tuple, Dict[str, str]] = {}
+
+    def _open(self) -> pd.ExcelFile:
+        if self._excel_file is None:
+            logging.debug(f"Opening workbook {self.file_path.name}")
+            self._excel_file = pd.ExcelFile(self.file_path, engine=self.engine)
+        return self._excel_file
+
+    def read_sheet(self, sheet_name=0, **options) -> pd.DataFrame:
+        """Return one sheet as a DataFrame, parsing the workbook only on a cache miss."""
+        if not self.cache.enabled or not isinstance(sheet_name, (str, int)):
+            return self._open().parse(sheet_name, **options)
+
+        key_options = dict(options, engine=self.engine) if self.engine else options
+        key = self.cache.key(self.file_path, sheet_name, key_options)
+        df = self.cache.get(key)
+        if df is None:
+            df = self._open().parse(sheet_name, **options)
+            self.cache.put(key, df)
+        return df
+
+    def iter_chunks(self, sheet_name=0, chunk_rows: int = DEFAULT_CHUNK_ROWS, usecols=None) -> Iterator[pd.DataFrame]:
+        """Stream one sheet in chunks, sharing a single read-only handle across sheets."""
+        if self._streaming_workbook is None and self.file_path.suffix.lower() in ('.xlsx', '.xlsm', '.xlsb'):
+            self._streaming_workbook = StreamingWorkbook(self.file_path)
+        return iter_sheet_chunks(self.file_path, sheet_name, chunk_rows, usecols=usecols,
+                                 workbook=self._streaming_workbook)
+
+    def legend_codes(self, sheet_name='Legend', column='Unnamed: 0') -> Dict[str, str]:
+        """
+        Parse a legend sheet whose rows look like 'CODE - Description' into a
+        {code: description} map. Parsed once per sheet and reused afterwards.
+        """
+        memo_key = (sheet_name, column)
+        if memo_key not in self._legends:
+            entries = self.read_sheet(sheet_name)[column].dropna().astype(str)
+            entries = entries[entries.str.contains(' - ', regex=False)]
+            parts = entries.str.split(' - ', n=1, expand=True)
+            codes = {} if parts.empty else dict(zip(parts[0].str.strip(), parts[1].str.strip()))
+            self._legends[memo_key] = codes
+        return self._legends[memo_key]
+
+    def close(self) -> None:
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+        if self._streaming_workbook is not None:
+            self._streaming_workbook.close()
+            self._streaming_workbook = None
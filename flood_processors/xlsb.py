@@ -0,0 +1,136 @@
+import math
+import numbers
+import struct
+import zipfile
+import pandas as pd
+from typing import Dict
+
+# BIFF12 record types used by a minimal workbook (see [MS-XLSB] 2.3.2)
+_ROW = 0x0000
+_CELL_FLOAT = 0x0005
+_CELL_STRING = 0x0007
+_SHARED_STRING = 0x0013
+_WORKSHEET = 0x0181
+_WORKSHEET_END = 0x0182
+_WORKBOOK = 0x0183
+_WORKBOOK_END = 0x0184
+_SHEETS = 0x018F
+_SHEETS_END = 0x0190
+_SHEETDATA = 0x0191
+_SHEETDATA_END = 0x0192
+_DIMENSION = 0x0194
+_SHEET = 0x019C
+_SST = 0x019F
+_SST_END = 0x01A0
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="bin" ContentType="application/vnd.ms-excel.sheet.binary.macroEnabled.main"/>
+<Override PartName="/xl/workbook.bin" ContentType="application/vnd.ms-excel.sheet.binary.macroEnabled.main"/>
+{sheets}<Override PartName="/xl/sharedStrings.bin" ContentType="application/vnd.ms-excel.sharedStrings"/>
+</Types>"""
+
+_SHEET_CONTENT_TYPE = '<Override PartName="/xl/worksheets/sheet{n}.bin" ContentType="application/vnd.ms-excel.worksheet"/>\n'
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.bin"/>
+</Relationships>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{sheets}<Relationship Id="rId{strings}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.bin"/>
+</Relationships>"""
+
+_SHEET_REL = ('<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"'
+              ' Target="worksheets/sheet{n}.bin"/>\n')
+
+
+def _record(record_type: int, data: bytes = b'') -> bytes:
+    """Encode a record: variable-length type and size headers followed by the payload."""
+    header = bytearray(record_type.to_bytes(2, 'little') if record_type >= 0x80 else bytes([record_type]))
+    size = len(data)
+    while True:
+        byte = size & 0x7F
+        size >>= 7
+        header.append(byte | 0x80 if size else byte)
+        if not size:
+            break
+    return bytes(header) + data
+
+
+def _wide_string(text: str) -> bytes:
+    encoded = text.encode('utf-16-le')
+    return struct.pack('<I', len(encoded) // 2) + encoded
+
+
+class _SharedStrings:
+    """Shared string table; each distinct string is stored once and referenced by index."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.count = 0
+
+    def __getitem__(self, text: str) -> int:
+        self.count += 1
+        return self.index.setdefault(text, len(self.index))
+
+    def to_bytes(self) -> bytes:
+        parts = [_record(_SST, struct.pack('<II', self.count, len(self.index)))]
+        parts.extend(_record(_SHARED_STRING, b'\x00' + _wide_string(text)) for text in self.index)
+        parts.append(_record(_SST_END))
+        return b''.join(parts)
+
+
+def _cell(column: int, value, strings: _SharedStrings) -> bytes:
+    """Encode one cell; numbers (including Excel date serials) as doubles, anything else as text."""
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return _record(_CELL_FLOAT, struct.pack('<IId', column, 0, float(value)))
+    return _record(_CELL_STRING, struct.pack('<III', column, 0, strings[str(value)]))
+
+
+def _worksheet(df: pd.DataFrame, strings: _SharedStrings) -> bytes:
+    """Encode a sheet with the column names as its header row; missing values are left empty."""
+    rows = [list(df.columns), *df.itertuples(index=False, name=None)]
+    last_column = max(len(df.columns) - 1, 0)
+    parts = [_record(_WORKSHEET),
+             _record(_DIMENSION, struct.pack('<IIII', 0, len(rows) - 1, 0, last_column)),
+             _record(_SHEETDATA)]
+    for row_number, row in enumerate(rows):
+        parts.append(_record(_ROW, struct.pack('<I', row_number) + bytes(21)))
+        for column, value in enumerate(row):
+            if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NA:
+                continue
+            parts.append(_cell(column, value, strings))
+    parts.extend([_record(_SHEETDATA_END), _record(_WORKSHEET_END)])
+    return b''.join(parts)
+
+
+def write_xlsb(path, sheets: Dict[str, pd.DataFrame]) -> None:
+    """
+    Write DataFrames as the sheets of a binary (.xlsb) workbook.
+
+    Only what readers need to get at the values is written: no styles, so
+    dates must already be Excel serial numbers (which is how .xlsb files
+    store them anyway). Intended for generating test data.
+    """
+    strings = _SharedStrings()
+    names = list(sheets)
+    worksheets = [_worksheet(sheets[name], strings) for name in names]
+
+    workbook = [_record(_WORKBOOK), _record(_SHEETS)]
+    for n, name in enumerate(names, start=1):
+        workbook.append(_record(_SHEET, struct.pack('<II', 0, n) + _wide_string(f'rId{n}') + _wide_string(name)))
+    workbook.extend([_record(_SHEETS_END), _record(_WORKBOOK_END)])
+
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES.format(
+            sheets=''.join(_SHEET_CONTENT_TYPE.format(n=n) for n in range(1, len(names) + 1))))
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/_rels/workbook.bin.rels', _WORKBOOK_RELS.format(
+            sheets=''.join(_SHEET_REL.format(n=n) for n in range(1, len(names) + 1)), strings=len(names) + 1))
+        archive.writestr('xl/workbook.bin', b''.join(workbook))
+        for n, data in enumerate(worksheets, start=1):
+            archive.writestr(f'xl/worksheets/sheet{n}.bin', data)
+        archive.writestr('xl/sharedStrings.bin', strings.to_bytes())
@@ -0,0 +1,32 @@
+import argparse
+import logging
+import sys
+
+from flood_processors.synthetic import DEFAULT_ROWS, generate_source_tree
+from flood_processors.logs import configure_logging
+
+def main():
+    parser = argparse.ArgumentParser(description='Write synthetic workbooks with the exact sheet names and headers of every '
+                                                 'company\'s EIR files, laid out like source/')
+    parser.add_argument('--output', '-o', default='synthetic/source', help='Folder to create the company folders in')
+    parser.add_argument('--rows', '-n', type=int, default=DEFAULT_ROWS, help='Rows per data sheet')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (the same seed gives the same workbooks)')
+    parser.add_argument('--source', '-s', action='append', help='Only generate this company folder (can be repeated)')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Number of companies written in parallel')
+    args = parser.parse_args()
+    configure_logging('generate_synthetic_data', level=logging.INFO)
+
+    try:
+        written = generate_source_tree(args.output, rows=args.rows, seed=args.seed, companies=args.source,
+                                       workers=args.workers)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    print("=== SYNTHETIC SOURCE ===")
+    for company, paths in written.items():
+        print(f"{company}: {len(paths)} workbooks")
+    print(f"\nRun the pipeline on it with: python run_pipeline.py --source-dir \"{args.output}\"")
+
+if __name__ == "__main__":
+    main()
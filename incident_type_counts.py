@@ -1,66 +1,62 @@
 import pandas as pd
-from pathlib import Path
 import argparse
 import sys
 
-def concatenate_parquet_files():
-    """Reuse the concatenation logic from preview_results.py"""
-    results_path = Path('results')
-    parquet_files = list(results_path.glob('*.parquet'))
+from flood_processors.dataset import DATASET_DIR, open_dataset
+from flood_processors.scan import scan_counts
+from flood_processors.schema import INCIDENT_FIELDS
+
+def count_incident_types(workers=None, by_fields=False):
+    """Count records per company and incident type (or its fields), scanning the results files in parallel"""
+    dataset = open_dataset()
     
-    if not parquet_files:
-        print("No parquet files found in results folder", file=sys.stderr)
+    if dataset is None:
+        print(f"No results found in {DATASET_DIR}", file=sys.stderr)
         sys.exit(1)
     
-    print(f"Found {len(parquet_files)} parquet files in results folder:")
-    for file in parquet_files:
-        print(f"  - {file.name}")
+    print(f"Found {len(dataset.files)} parquet files in {DATASET_DIR}:")
+    for company in dataset.partitioning.dictionaries[0].to_pylist():
+        print(f"  - {company}")
     print()
     
-    # Read and concatenate all parquet files
-    dfs = []
-    for file in parquet_files:
-        df_temp = pd.read_parquet(file)
-        df_temp['company'] = file.stem.split('_')[0]
-        dfs.append(df_temp)
-    
-    df = pd.concat(dfs, ignore_index=True)
-    print(f"Concatenated {len(df)} total rows from {len(parquet_files)} files")
+    # Each file is aggregated on its own; only the partial counts are merged
+    group_by = ['company', *INCIDENT_FIELDS] if by_fields else ['company', 'incident_type']
+    incident_counts = scan_counts(dataset, group_by, workers=workers)
+    print(f"Counted {incident_counts['count'].sum()} total rows from {len(dataset.files)} files")
     print()
     
-    return df
+    return incident_counts
 
 def main():
     parser = argparse.ArgumentParser(description='Generate incident type counts table from all parquet files in results folder')
     parser.add_argument('--output', '-o', help='Output file path (optional - if not provided, prints to console)')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='Number of files scanned in parallel')
+    parser.add_argument('--by-fields', action='store_true',
+                        help=f"Count by the structured incident fields ({', '.join(INCIDENT_FIELDS)}) instead")
     args = parser.parse_args()
     
     try:
-        # Concatenate all parquet files
-        df = concatenate_parquet_files()
-        
-        # Check if incident_type column exists
-        if 'incident_type' not in df.columns:
-            print("Error: 'incident_type' column not found in the data", file=sys.stderr)
-            print("Available columns:", df.columns.tolist(), file=sys.stderr)
-            sys.exit(1)
-        
         # Generate incident type counts
-        incident_counts = df.groupby(['company', 'incident_type']).size().reset_index(name='count')
+        incident_counts = count_incident_types(args.workers, args.by_fields)
+        total_incidents = incident_counts['count'].sum()
+        if args.by_fields:
+            incident_counts = incident_counts.dropna(subset=INCIDENT_FIELDS, how='all')
+            incident_counts = incident_counts.sort_values(['company', *INCIDENT_FIELDS])
+            counts_df = incident_counts.rename(columns={'company': 'Company', 'count': 'Count'})
+        else:
+            incident_counts = incident_counts.dropna(subset=['incident_type']).sort_values(['company', 'incident_type'])
+            counts_df = pd.DataFrame({
+                'Company': incident_counts['company'],
+                'Incident Type': incident_counts['incident_type'],
+                'Count': incident_counts['count']
+            })
         
         # Create a formatted table
         print("=== INCIDENT TYPE COUNTS ===")
-        print(f"Total incidents: {len(df)}")
+        print(f"Total incidents: {total_incidents}")
         print(f"Unique incident types: {len(incident_counts)}")
         print()
         
-        # Create a DataFrame for better formatting
-        counts_df = pd.DataFrame({
-            'Company': incident_counts['company'],
-            'Incident Type': incident_counts['incident_type'],
-            'Count': incident_counts['count']
-        })
-        
         # Display the table
         print(counts_df.to_string(index=False))
         
@@ -0,0 +1,38 @@
+import pandas as pd
+import argparse
+import sys
+import time
+
+from flood_processors.pipeline import run_pipeline
+from flood_processors.logs import configure_logging
+
+def main():
+    parser = argparse.ArgumentParser(description='Run every company processor in source/ in parallel and write results/')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--source', '-s', action='append', help='Only run this source folder (can be repeated)')
+    parser.add_argument('--source-dir', default='source', help='Folder containing one sub-folder per company')
+    parser.add_argument('--stream', type=int, nargs='?', const=50000, default=None, metavar='ROWS',
+                        help='Bounded-memory mode: read sheets and write parquet row groups ROWS rows at a time')
+    parser.add_argument('--force', '-f', action='store_true', help='Rebuild every company, even if its inputs are unchanged')
+    args = parser.parse_args()
+    configure_logging('pipeline')
+
+    start = time.perf_counter()
+    results = run_pipeline(args.source_dir, workers=args.workers, sources=args.source, incremental=not args.force,
+                           chunk_rows=args.stream)
+    if not results:
+        print("No processors found", file=sys.stderr)
+        sys.exit(1)
+
+    summary = pd.DataFrame(results)[['source', 'status', 'records', 'seconds', 'output', 'error']]
+    print("=== PIPELINE RUN ===")
+    print(summary.fillna('').to_string(index=False))
+    print(f"\nFinished {len(results)} processors in {time.perf_counter() - start:.1f}s")
+
+    failed = summary[summary['status'] == 'failed']
+    if not failed.empty:
+        print(f"{len(failed)} processors failed", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()